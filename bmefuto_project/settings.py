@@ -33,10 +33,42 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.StudentMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Query budgets per view (core.querybudget), on in development. Set
+# QUERY_BUDGET_RAISE to turn an exceeded budget into an error.
+QUERY_BUDGET = config('QUERY_BUDGET', default=DEBUG, cast=bool)
+QUERY_BUDGET_DEFAULT = 25
+QUERY_BUDGET_RAISE = config('QUERY_BUDGET_RAISE', default=False, cast=bool)
+if QUERY_BUDGET:
+    MIDDLEWARE.insert(0, 'core.querybudget.QueryBudgetMiddleware')
+
+# A log line per request and, for staff or with DEBUG on, a Server-Timing
+# header (core.timing); requests over SLOW_REQUEST_MS are logged with their
+# SQL to core.timing.slow.
+REQUEST_TIMING = config('REQUEST_TIMING', default=True, cast=bool)
+SLOW_REQUEST_MS = config('SLOW_REQUEST_MS', default=500, cast=int)
+if REQUEST_TIMING:
+    MIDDLEWARE.insert(0, 'core.timing.RequestTimingMiddleware')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.timing': {
+            'handlers': ['console'],
+            'level': config('REQUEST_TIMING_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 ROOT_URLCONF = 'bmefuto_project.urls'
 
 TEMPLATES = [
@@ -70,6 +102,37 @@ DATABASES = {
     'default': dj_database_url.parse(config('DATABASE_URL'))
 }
 
+# Deployed, the site runs in many processes (gunicorn workers, serverless
+# instances), so the cache must be shared for the cached students, counters
+# and content versions invalidated by signals to go stale nowhere: Redis
+# when REDIS_URL is set (needs the redis package), otherwise the database
+# table made by createcachetable. Set REDIS_URL in production: a database
+# cache read costs a query, so with it the logged-in student is not cached
+# at all (core.middleware.caches_students) and the per-request saving is
+# lost. runserver is one process, so development keeps the local memory
+# cache.
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL},
+    }
+elif not DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+            # The default of 300 entries would cull content versions as soon
+            # as the per-student entries fill it
+            'OPTIONS': {'MAX_ENTRIES': 50000},
+        },
+    }
+
+# Proxies in front of the site that append the client address to
+# X-Forwarded-For (Vercel's edge is one); the rate limits (core.ratelimit)
+# key on the address the outermost of them saw. Set to 0 when the site is
+# served directly, or clients could pick their own address.
+RATELIMIT_TRUSTED_PROXIES = config('RATELIMIT_TRUSTED_PROXIES', default=1, cast=int)
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -115,6 +178,13 @@ cloudinary.config(
 
 CLOUDINARY_URL = config('CLOUDINARY_URL')
 
+# Keep uploads on local disk instead of calling the Cloudinary API (load
+# tests and offline runs; see core.fake_cloudinary)
+CLOUDINARY_FAKE = config('CLOUDINARY_FAKE', default=False, cast=bool)
+if CLOUDINARY_FAKE:
+    from core.fake_cloudinary import install_fake_cloudinary
+    install_fake_cloudinary(MEDIA_ROOT / 'cloudinary')
+
 # Crispy Forms
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap4"
 CRISPY_TEMPLATE_PACK = "bootstrap4"
@@ -1,9 +1,16 @@
 from django.contrib import admin
+from django.db import transaction
 from .models import (
     Staff, Exco, PastQuestion, LibraryResource, 
     Testimonial, Announcement, Student, Semester, 
-    Course, CGPACalculation, DepartmentalDues, CourseHandbook, Timetable, AcademicCalendar
+    Course, CGPACalculation, CGPASummary, DepartmentalDues, CourseHandbook, Timetable, AcademicCalendar,
+    SiteCounters, ReceiptSequence
 )
+from .cgpa import apply_delta, course_added, course_changed, course_contribution, course_removed, semester_removed
+from .content_cache import bump_content_version
+from .counters import recount
+from .pagination import EstimatedCountPaginator
+from .receipts import invalidate_receipts
 
 @admin.register(Staff)
 class StaffAdmin(admin.ModelAdmin):
@@ -42,10 +49,15 @@ class TestimonialAdmin(admin.ModelAdmin):
     
     def approve_testimonials(self, request, queryset):
         queryset.update(is_approved=True)
+        # update() skips the post_save signal
+        bump_content_version()
+        recount(Testimonial)
     approve_testimonials.short_description = "Approve selected testimonials"
     
     def unapprove_testimonials(self, request, queryset):
         queryset.update(is_approved=False)
+        bump_content_version()
+        recount(Testimonial)
     unapprove_testimonials.short_description = "Unapprove selected testimonials"
 
 @admin.register(Announcement)
@@ -64,6 +76,8 @@ class StudentAdmin(admin.ModelAdmin):
     search_fields = ['reg_number', 'full_name', 'email']
     ordering = ['-created_at']
     readonly_fields = ['created_at', 'updated_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     fieldsets = (
         ('Basic Information', {
@@ -81,14 +95,27 @@ class StudentAdmin(admin.ModelAdmin):
 
 @admin.register(Semester)
 class SemesterAdmin(admin.ModelAdmin):
-    list_display = ['student', 'name', 'year', 'courses_count', 'created_at']
+    list_display = ['student', 'name', 'year', 'courses_count', 'gpa', 'created_at']
     list_filter = ['created_at', 'year']
     search_fields = ['student__reg_number', 'student__full_name', 'name']
     ordering = ['-created_at']
+    readonly_fields = ['courses_count', 'total_credits', 'total_points', 'gpa']
+    autocomplete_fields = ['student']
+    list_select_related = ['student']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
-    def courses_count(self, obj):
-        return obj.courses.count()
-    courses_count.short_description = 'Courses'
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            semester_removed(obj)
+    
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            semesters = list(queryset)
+            super().delete_queryset(request, queryset)
+            for semester in semesters:
+                semester_removed(semester)
 
 
 @admin.register(Course)
@@ -97,6 +124,42 @@ class CourseAdmin(admin.ModelAdmin):
     list_filter = ['grade_point', 'credit_unit', 'created_at']
     search_fields = ['course_code', 'course_name', 'semester__student__reg_number']
     ordering = ['-created_at']
+    autocomplete_fields = ['semester']
+    list_select_related = ['semester']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
+    # The stored semester and CGPA totals are moved by the cgpa helpers,
+    # exactly as the student pages do
+    def save_model(self, request, obj, form, change):
+        previous = Course.objects.get(pk=obj.pk) if change else None
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            if previous is None:
+                course_added(obj)
+            elif previous.semester_id != obj.semester_id:
+                course_removed(previous)
+                course_added(obj)
+            else:
+                course_changed(obj, course_contribution(previous))
+    
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            course_removed(obj)
+    
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            courses = list(queryset)
+            super().delete_queryset(request, queryset)
+            # One delta per semester rather than per course
+            totals = {}
+            for course in courses:
+                n, c, p = totals.get(course.semester_id, (0, 0, 0.0))
+                _, credits, points = course_contribution(course)
+                totals[course.semester_id] = (n - 1, c - credits, p - points)
+            for semester_id, delta in totals.items():
+                apply_delta(semester_id, *delta)
 
 
 @admin.register(CGPACalculation)
@@ -106,6 +169,9 @@ class CGPACalculationAdmin(admin.ModelAdmin):
     search_fields = ['student__reg_number', 'student__full_name']
     ordering = ['-calculated_at']
     readonly_fields = ['student', 'cgpa', 'total_credit_units', 'total_grade_points', 'calculated_at']
+    list_select_related = ['student']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     def has_add_permission(self, request):
         # Prevent manual addition through admin
@@ -116,12 +182,32 @@ class CGPACalculationAdmin(admin.ModelAdmin):
         return False
 
 
+@admin.register(CGPASummary)
+class CGPASummaryAdmin(admin.ModelAdmin):
+    list_display = ['student', 'cgpa', 'total_credits', 'total_points', 'updated_at']
+    search_fields = ['student__reg_number', 'student__full_name']
+    ordering = ['-updated_at']
+    readonly_fields = ['student', 'cgpa', 'total_credits', 'total_points', 'updated_at']
+    list_select_related = ['student']
+    
+    def has_add_permission(self, request):
+        # Maintained by the CGPA calculator, see rebuild_cgpa_totals
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(DepartmentalDues)
 class DepartmentalDuesAdmin(admin.ModelAdmin):
     list_display = ['receipt_number', 'student', 'amount_paid', 'is_approved', 'academic_session', 'created_at']
     list_filter = ['is_approved', 'academic_session', 'created_at']
     search_fields = ['student__reg_number', 'student__full_name', 'receipt_number', 'payment_reference']
     readonly_fields = ['receipt_number', 'watermark_code', 'payment_reference', 'created_at', 'updated_at', 'approved_at']
+    autocomplete_fields = ['student']
+    list_select_related = ['student']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     actions = ['approve_dues', 'unapprove_dues']
     
     fieldsets = (
@@ -146,16 +232,50 @@ class DepartmentalDuesAdmin(admin.ModelAdmin):
     
     def approve_dues(self, request, queryset):
         from django.utils import timezone
+        codes = list(queryset.values_list('watermark_code', 'receipt_number'))
         updated = queryset.update(is_approved=True, approved_by=request.user, approved_at=timezone.now())
+        # update() skips the signals that recount and drop cached verifications
+        recount(DepartmentalDues)
+        invalidate_receipts(code for pair in codes for code in pair)
         self.message_user(request, f'{updated} dues approved successfully.')
     approve_dues.short_description = "Approve selected dues"
     
     def unapprove_dues(self, request, queryset):
+        codes = list(queryset.values_list('watermark_code', 'receipt_number'))
         updated = queryset.update(is_approved=False, approved_by=None, approved_at=None)
+        recount(DepartmentalDues)
+        invalidate_receipts(code for pair in codes for code in pair)
         self.message_user(request, f'{updated} dues unapproved.')
     unapprove_dues.short_description = "Unapprove selected dues"
 
 
+@admin.register(ReceiptSequence)
+class ReceiptSequenceAdmin(admin.ModelAdmin):
+    list_display = ['year', 'last_number', 'updated_at']
+    readonly_fields = [field.name for field in ReceiptSequence._meta.fields]
+    
+    def has_add_permission(self, request):
+        # Only ReceiptSequence.allocate moves the numbers; an edit here
+        # would hand out receipt numbers that already exist
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(SiteCounters)
+class SiteCountersAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'total_students', 'dues_approved', 'dues_pending', 'updated_at']
+    readonly_fields = [field.name for field in SiteCounters._meta.fields]
+    
+    def has_add_permission(self, request):
+        # Maintained by signals, see reconcile_counters
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(CourseHandbook)
 class CourseHandbookAdmin(admin.ModelAdmin):
     list_display = ['course_code', 'course_title', 'level', 'semester', 'credit_unit', 'course_type', 'created_at']
@@ -0,0 +1,157 @@
+# Cohort analytics over every recorded course. One values_list stream is
+# folded into per-student and per-course totals as it is read, so a full
+# recompute touches each row once and holds only the totals. Admin pages
+# read the cached snapshot rather than the tables.
+from bisect import bisect_left
+from collections import defaultdict
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+from .models import Course, CGPACalculation, Student
+
+ANALYTICS_CACHE_KEY = 'analytics:snapshot'
+ANALYTICS_CACHE_TIMEOUT = 60 * 60
+
+GRADE_POINTS = [5.0, 4.0, 3.0, 2.0, 1.0, 0.0]
+GRADE_LETTERS = ['A', 'B', 'C', 'D', 'E', 'F']
+# Ten half-point CGPA bins from 0.0 to 5.0; the last one includes 5.0
+HISTOGRAM_WIDTH = 0.5
+HISTOGRAM_BINS = 10
+PERCENTILES = (10, 25, 50, 75, 90)
+TOP_STUDENTS = 10
+
+
+def load_totals():
+    """
+    One pass over every course row: per student [level, credits, credit x
+    grade points] and per course code [rows, credits, grade points, count
+    per grade]
+    """
+    students = {}
+    courses = defaultdict(lambda: [0, 0, 0.0, [0] * len(GRADE_POINTS)])
+    rows = Course.objects.order_by().values_list(
+        'semester__student_id', 'semester__student__level', 'course_code', 'credit_unit', 'grade_point'
+    )
+    for student, level, code, credit, point in rows.iterator(chunk_size=5000):
+        totals = students.get(student)
+        if totals is None:
+            totals = students[student] = [level, 0, 0.0]
+        totals[1] += credit
+        totals[2] += credit * point
+        course = courses[code]
+        course[0] += 1
+        course[1] += credit
+        course[2] += point
+        # Grade points are whole numbers 0-5; map them to the A-F column
+        course[3][int(GRADE_POINTS[0] - point)] += 1
+    return students, courses
+
+
+def percentile(ordered, q):
+    """q-th percentile of sorted values, interpolating between neighbours"""
+    position = (len(ordered) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def _course_stats(courses):
+    """Grade distribution, mean and pass rate per course code"""
+    return [{
+        'course_code': code,
+        'credit_unit': int(round(credits / taken)),
+        'students': taken,
+        'mean_grade': round(points / taken, 2),
+        'pass_rate': round((taken - grades[-1]) / taken, 4),
+        'grades': dict(zip(GRADE_LETTERS, grades)),
+    } for code, (taken, credits, points, grades) in sorted(courses.items())]
+
+
+def _level_stats(cgpas, calculations):
+    """
+    Percentiles, histogram and top students of the CGPAs per level, plus
+    each student's (rank, students in the level, students below them);
+    rank 1 is the highest CGPA and ties share the better rank
+    """
+    members = defaultdict(list)
+    for reg_number, (level, cgpa) in cgpas.items():
+        members[level].append((cgpa, reg_number))
+
+    levels = {}
+    ranks = {}
+    for level, rows in members.items():
+        values = sorted(cgpa for cgpa, _ in rows)
+        histogram = [0] * HISTOGRAM_BINS
+        for value in values:
+            histogram[min(int(value / HISTOGRAM_WIDTH), HISTOGRAM_BINS - 1)] += 1
+        ranked = sorted(rows, key=lambda row: (-row[0], row[1]))
+        rank = 0
+        for position, (cgpa, reg_number) in enumerate(ranked):
+            if position == 0 or cgpa != ranked[position - 1][0]:
+                rank = position + 1
+            ranks[reg_number] = (rank, len(rows), bisect_left(values, cgpa))
+        top = ranked[:TOP_STUDENTS]
+        levels[level] = {
+            'level': level,
+            'students': len(rows),
+            'calculations': calculations.get(level, 0),
+            'mean': round(sum(values) / len(values), 2),
+            'percentiles': {f'p{q}': round(percentile(values, q), 2) for q in PERCENTILES},
+            'histogram': [{'range': f'{i * HISTOGRAM_WIDTH:.1f}-{(i + 1) * HISTOGRAM_WIDTH:.1f}', 'count': n}
+                          for i, n in enumerate(histogram)],
+            'top': [{'reg_number': reg_number, 'cgpa': round(cgpa, 2)} for cgpa, reg_number in top],
+        }
+    return levels, ranks
+
+
+def build_snapshot():
+    students, courses = load_totals()
+    cgpas = {
+        reg_number: (level, points / credits if credits else 0.0)
+        for reg_number, (level, credits, points) in students.items()
+    }
+    calculations = dict(CGPACalculation.objects.order_by()
+                        .values_list('student__level').annotate(n=Count('id')))
+
+    by_level, ranks = _level_stats(cgpas, calculations)
+    top_ids = [row['reg_number'] for level in by_level.values() for row in level['top']]
+    names = dict(Student.objects.filter(pk__in=top_ids).values_list('pk', 'full_name'))
+    for level in by_level.values():
+        for row in level['top']:
+            row['full_name'] = names.get(row['reg_number'], '')
+
+    return {
+        'computed_at': timezone.now(),
+        'students': len(students),
+        'course_rows': sum(course[0] for course in courses.values()),
+        'levels': [by_level[level] for level in sorted(by_level)],
+        'courses': _course_stats(courses),
+        'ranks': ranks,
+    }
+
+
+def refresh_snapshot():
+    snapshot = build_snapshot()
+    cache.set(ANALYTICS_CACHE_KEY, snapshot, ANALYTICS_CACHE_TIMEOUT)
+    return snapshot
+
+
+def get_snapshot():
+    """The cached analytics snapshot, recomputed once it has expired"""
+    snapshot = cache.get(ANALYTICS_CACHE_KEY)
+    if snapshot is None:
+        snapshot = refresh_snapshot()
+    return snapshot
+
+
+def student_rank(reg_number):
+    """
+    {'rank', 'of', 'percentile'} for a student within their level in the
+    snapshot, or None if they had no courses when it was built. percentile
+    is the share of the level with a lower CGPA.
+    """
+    entry = get_snapshot()['ranks'].get(reg_number)
+    if entry is None:
+        return None
+    rank, size, below = entry
+    return {'rank': rank, 'of': size, 'percentile': round(100 * below / size, 1)}
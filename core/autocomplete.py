@@ -0,0 +1,112 @@
+import time
+from bisect import bisect_left
+from django.db.models import Q
+from .content_cache import content_version
+from .models import CourseHandbook, Student
+
+DEFAULT_SUGGESTIONS = 8
+MAX_SUGGESTIONS = 20
+MAX_STUDENT_RESULTS = 20
+# A process rebuilds its index at least this often, so changes made without
+# a version bump (bulk SQL, a restored backup) still show up
+INDEX_MAX_AGE = 60 * 10
+
+
+def normalize(text):
+    """Lowercase with spaces removed, so "bme 30", "BME30" and "bme30" agree"""
+    return ''.join((text or '').lower().split())
+
+
+class CoursePrefixIndex:
+    """
+    Sorted (key, position) pairs over every handbook course. A lookup is a
+    bisect to the first key with the prefix followed by a short forward scan.
+    """
+
+    def __init__(self, courses):
+        self.courses = courses
+        keys = []
+        for position, course in enumerate(courses):
+            keys.append((normalize(course['code']), position))
+            # Titles match from the start of any word: "bio" finds "Intro to Biomaterials"
+            words = course['title'].lower().split()
+            for i in range(len(words)):
+                keys.append((''.join(words[i:]), position))
+        keys.sort()
+        self.keys = keys
+
+    def lookup(self, prefix, limit=DEFAULT_SUGGESTIONS):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        matches = []
+        seen = set()
+        keys = self.keys
+        i = bisect_left(keys, (prefix,))
+        while i < len(keys) and len(matches) < limit:
+            key, position = keys[i]
+            if not key.startswith(prefix):
+                break
+            code = self.courses[position]['code']
+            if code not in seen:
+                seen.add(code)
+                matches.append(self.courses[position])
+            i += 1
+        return matches
+
+
+_local_index = {'version': None, 'index': None, 'built': 0.0}
+
+
+def build_index():
+    courses = [
+        {
+            'code': course['course_code'],
+            'title': course['course_title'],
+            'credit_unit': course['credit_unit'],
+            'level': course['level'],
+            'semester': course['semester'],
+        }
+        for course in CourseHandbook.objects.values(
+            'course_code', 'course_title', 'credit_unit', 'level', 'semester'
+        )
+    ]
+    return CoursePrefixIndex(courses)
+
+
+def get_index():
+    """
+    The per-process index, rebuilt when the handbook version in the shared
+    cache has moved (a handbook row changed in any process) or the index is
+    older than INDEX_MAX_AGE
+    """
+    version = content_version('handbook')
+    now = time.monotonic()
+    if _local_index['version'] != version or now - _local_index['built'] > INDEX_MAX_AGE:
+        _local_index.update(index=build_index(), version=version, built=now)
+    return _local_index['index']
+
+
+def suggest_courses(prefix, limit=DEFAULT_SUGGESTIONS):
+    return get_index().lookup(prefix, max(1, min(limit, MAX_SUGGESTIONS)))
+
+
+def suggest_students(query, limit=MAX_STUDENT_RESULTS):
+    """
+    Students whose reg number or name starts with query. Plain startswith
+    lookups so the prefix indexes on both columns are used; names are
+    tried as typed, Title Case and UPPER CASE instead of istartswith,
+    which would defeat the index.
+    """
+    query = ' '.join((query or '').split())
+    if not query:
+        return []
+    condition = Q()
+    for variant in {query, query.title(), query.upper()}:
+        condition |= Q(reg_number__startswith=variant) | Q(full_name__startswith=variant)
+    limit = max(1, min(limit, MAX_STUDENT_RESULTS))
+    return [
+        {'id': reg_number, 'text': f"{reg_number} - {full_name}"}
+        for reg_number, full_name in Student.objects.filter(condition)
+        .order_by('reg_number').values_list('reg_number', 'full_name')[:limit]
+    ]
@@ -0,0 +1,264 @@
+from django.db import transaction
+from django.db.models import Count, Exists, F, FloatField, OuterRef, Sum, Value
+from django.db.models.functions import Coalesce
+from .models import Semester, Course, CGPASummary, CGPACalculation
+
+
+def compute_gpa(total_points, total_credits):
+    """GPA rounded the way every page displays it"""
+    return round(total_points / total_credits, 2) if total_credits > 0 else 0.0
+
+
+def course_contribution(course):
+    """Return the (courses, credits, points) a course adds to its semester"""
+    return 1, course.credit_unit, course.credit_unit * course.grade_point
+
+
+def with_totals(semesters):
+    """
+    Annotate a Semester queryset with totals aggregated from its courses.
+    Used to rebuild and verify the stored totals.
+    """
+    return semesters.annotate(
+        computed_courses=Count('courses'),
+        computed_credits=Coalesce(Sum('courses__credit_unit'), Value(0)),
+        computed_points=Coalesce(
+            Sum(F('courses__credit_unit') * F('courses__grade_point'), output_field=FloatField()),
+            Value(0.0),
+        ),
+    )
+
+
+def get_summary(student):
+    """Return the student's CGPASummary without creating one"""
+    try:
+        return student.cgpa_summary
+    except CGPASummary.DoesNotExist:
+        return CGPASummary(student=student)
+
+
+@transaction.atomic
+def apply_delta(semester_id, courses=0, credits=0, points=0.0):
+    """Add a change in course totals to the semester and the student's summary"""
+    semester = Semester.objects.select_for_update().get(pk=semester_id)
+    semester.courses_count += courses
+    semester.total_credits += credits
+    semester.total_points += points
+    semester.gpa = compute_gpa(semester.total_points, semester.total_credits)
+    semester.save(update_fields=['courses_count', 'total_credits', 'total_points', 'gpa'])
+
+    summary, _ = CGPASummary.objects.select_for_update().get_or_create(student_id=semester.student_id)
+    summary.total_credits += credits
+    summary.total_points += points
+    summary.cgpa = compute_gpa(summary.total_points, summary.total_credits)
+    summary.save(update_fields=['total_credits', 'total_points', 'cgpa', 'updated_at'])
+    return semester
+
+
+def course_added(course):
+    courses, credits, points = course_contribution(course)
+    return apply_delta(course.semester_id, courses, credits, points)
+
+
+def course_changed(course, previous):
+    """previous is the course_contribution() taken before the edit"""
+    _, credits, points = course_contribution(course)
+    return apply_delta(course.semester_id, 0, credits - previous[1], points - previous[2])
+
+
+def course_removed(course):
+    courses, credits, points = course_contribution(course)
+    return apply_delta(course.semester_id, -courses, -credits, -points)
+
+
+@transaction.atomic
+def add_courses(semester, courses):
+    """Insert unsaved Course objects into semester with one bulk_create"""
+    for course in courses:
+        course.semester = semester
+    created = Course.objects.bulk_create(courses)
+    totals = [course_contribution(course) for course in created]
+    apply_delta(
+        semester.pk,
+        len(totals),
+        sum(credits for _, credits, _ in totals),
+        sum(points for _, _, points in totals),
+    )
+    return created
+
+
+@transaction.atomic
+def sync_courses(semester, created=(), updated=(), deleted=()):
+    """
+    Apply a batch of course changes to one semester: unsaved Course objects
+    to insert, (course, previous contribution) pairs already edited in
+    memory, and courses to delete. Each kind is one query and the totals
+    are moved once for the whole batch.
+    """
+    courses = credits = points = 0
+    if deleted:
+        Course.objects.filter(semester=semester, pk__in=[course.pk for course in deleted]).delete()
+        for course in deleted:
+            n, c, p = course_contribution(course)
+            courses, credits, points = courses - n, credits - c, points - p
+    if updated:
+        Course.objects.bulk_update(
+            [course for course, _ in updated],
+            ['course_code', 'course_name', 'credit_unit', 'grade_point'],
+        )
+        for course, previous in updated:
+            _, c, p = course_contribution(course)
+            credits, points = credits + c - previous[1], points + p - previous[2]
+    if created:
+        for course in created:
+            course.semester = semester
+        Course.objects.bulk_create(created)
+        for course in created:
+            n, c, p = course_contribution(course)
+            courses, credits, points = courses + n, credits + c, points + p
+    return apply_delta(semester.pk, courses, credits, points)
+
+
+@transaction.atomic
+def semester_removed(semester):
+    """Take a deleted semester's totals out of the student's summary"""
+    summary, _ = CGPASummary.objects.select_for_update().get_or_create(student_id=semester.student_id)
+    summary.total_credits -= semester.total_credits
+    summary.total_points -= semester.total_points
+    summary.cgpa = compute_gpa(summary.total_points, summary.total_credits)
+    summary.save(update_fields=['total_credits', 'total_points', 'cgpa', 'updated_at'])
+
+
+def student_cgpa(student, with_courses=False):
+    """Per-semester and overall totals for a student, read from the stored values"""
+    semesters = student.semesters.all()
+    if with_courses:
+        semesters = semesters.prefetch_related('courses')
+    summary = get_summary(student)
+
+    rows = [{
+        'semester': semester,
+        'gpa': semester.gpa,
+        'courses_count': semester.courses_count,
+        'credits': semester.total_credits,
+        'points': semester.total_points,
+    } for semester in semesters]
+
+    return {
+        'semesters': rows,
+        'total_credits': summary.total_credits,
+        'total_points': summary.total_points,
+        'cgpa': summary.cgpa,
+    }
+
+
+def rebuild_totals(fix=True):
+    """
+    Recompute every stored semester and summary total from the courses.
+    Returns (semester mismatches, summary mismatches); when fix is True the
+    stored values are rewritten to match.
+    """
+    stale_semesters = []
+    per_student = {}
+    for semester in with_totals(Semester.objects.order_by()).iterator(chunk_size=2000):
+        credits = semester.computed_credits
+        points = semester.computed_points
+        gpa = compute_gpa(points, credits)
+        if (semester.courses_count, semester.total_credits, semester.total_points, semester.gpa) != \
+                (semester.computed_courses, credits, points, gpa):
+            semester.courses_count = semester.computed_courses
+            semester.total_credits = credits
+            semester.total_points = points
+            semester.gpa = gpa
+            stale_semesters.append(semester)
+        student_credits, student_points = per_student.get(semester.student_id, (0, 0.0))
+        per_student[semester.student_id] = (student_credits + credits, student_points + points)
+
+    existing = CGPASummary.objects.in_bulk(per_student.keys(), field_name='student_id')
+    stale_summaries = []
+    new_summaries = []
+    for student_id, (credits, points) in per_student.items():
+        cgpa = compute_gpa(points, credits)
+        summary = existing.get(student_id)
+        if summary is None:
+            new_summaries.append(CGPASummary(
+                student_id=student_id, total_credits=credits, total_points=points, cgpa=cgpa
+            ))
+        elif (summary.total_credits, summary.total_points, summary.cgpa) != (credits, points, cgpa):
+            summary.total_credits = credits
+            summary.total_points = points
+            summary.cgpa = cgpa
+            stale_summaries.append(summary)
+
+    # Students whose semesters were all removed should be back at zero
+    orphaned = CGPASummary.objects.filter(
+        ~Exists(Semester.objects.filter(student_id=OuterRef('student_id')))
+    ).exclude(total_credits=0, total_points=0.0, cgpa=0.0)
+    for summary in orphaned:
+        summary.total_credits = 0
+        summary.total_points = 0.0
+        summary.cgpa = 0.0
+        stale_summaries.append(summary)
+
+    if fix:
+        with transaction.atomic():
+            Semester.objects.bulk_update(
+                stale_semesters, ['courses_count', 'total_credits', 'total_points', 'gpa'], batch_size=500
+            )
+            CGPASummary.objects.bulk_update(
+                stale_summaries, ['total_credits', 'total_points', 'cgpa'], batch_size=500
+            )
+            CGPASummary.objects.bulk_create(new_summaries, batch_size=500)
+
+    return stale_semesters, stale_summaries + new_summaries
+
+
+# CGPA CALCULATION HISTORY
+def record_calculation(student, cgpa, total_credits, total_points):
+    """
+    Add a CGPACalculation unless the student's latest one already has these
+    totals. Returns (calculation or None, created).
+    """
+    latest = (student.cgpa_calculations
+              .values_list('cgpa', 'total_credit_units', 'total_grade_points')
+              .first())
+    if latest == (cgpa, total_credits, total_points):
+        return None, False
+    calculation = CGPACalculation.objects.create(
+        student=student,
+        cgpa=cgpa,
+        total_credit_units=total_credits,
+        total_grade_points=total_points,
+    )
+    return calculation, True
+
+
+def academic_session(moment):
+    """The "2023/2024" style session a date falls in; sessions start in September"""
+    start = moment.year if moment.month >= 9 else moment.year - 1
+    return f"{start}/{start + 1}"
+
+
+def compact_history(before, batch_size=1000, dry_run=False):
+    """
+    Collapse CGPACalculation rows older than before into one row per student
+    per academic session (the latest of that session), deleting the rest in
+    batches of batch_size. Returns the number of rows removed.
+    """
+    rows = (CGPACalculation.objects
+            .filter(calculated_at__lt=before)
+            .order_by('student_id', '-calculated_at', '-pk')
+            .values_list('pk', 'student_id', 'calculated_at'))
+    kept = set()
+    redundant = []
+    for pk, student_id, calculated_at in rows.iterator(chunk_size=5000):
+        key = (student_id, academic_session(calculated_at))
+        if key in kept:
+            redundant.append(pk)
+        else:
+            kept.add(key)
+
+    if not dry_run:
+        for start in range(0, len(redundant), batch_size):
+            CGPACalculation.objects.filter(pk__in=redundant[start:start + batch_size]).delete()
+    return len(redundant)
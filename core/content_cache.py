@@ -0,0 +1,65 @@
+import uuid
+from django.core.cache import cache
+from django.db.models import Count
+from .models import Staff, Exco, PastQuestion, LibraryResource, Testimonial, Announcement
+from .counters import get_counters
+
+# Models whose rows appear on the homepage; saving or deleting any of them
+# bumps the content version and so retires every cached homepage entry.
+HOMEPAGE_MODELS = (Staff, Exco, PastQuestion, LibraryResource, Testimonial, Announcement)
+
+HOMEPAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def content_version(scope='homepage'):
+    key = f'content:version:{scope}'
+    version = cache.get(key)
+    if version is None:
+        # add(), so processes that all find the key missing agree on one
+        # version instead of each caching entries under its own
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_content_version(scope='homepage'):
+    # A random token rather than a counter, so an evicted version key can
+    # never come back with a number that still has an entry cached under it.
+    version = uuid.uuid4().hex
+    cache.set(f'content:version:{scope}', version, None)
+    return version
+
+
+def _build_homepage_context():
+    return {
+        'testimonials': list(Testimonial.objects.filter(is_approved=True)[:6]),
+        'announcements': list(Announcement.objects.filter(is_active=True).select_related('created_by')[:5]),
+        'recent_staff': list(Staff.objects.all()[:3]),
+        'current_excos': list(Exco.objects.all()[:4]),
+        'recent_resources': list(LibraryResource.objects.all()[:6]),
+        'recent_questions': list(PastQuestion.objects.all()[:5]),
+        # Questions by level for chart
+        'questions_by_level': list(PastQuestion.objects.values('level').annotate(count=Count('id'))),
+    }
+
+
+def homepage_context():
+    """Homepage data, rebuilt only after homepage content has changed"""
+    key = f'homepage:{content_version()}'
+    context = cache.get(key)
+    if context is None:
+        context = _build_homepage_context()
+        cache.set(key, context, HOMEPAGE_CACHE_TIMEOUT)
+
+    # Statistics for homepage come from the maintained counters, which
+    # change with student registrations as well as homepage content
+    counters = get_counters()
+    return {
+        **context,
+        'stats': {
+            'total_staff': counters.staff_count,
+            'total_students': counters.total_students,
+            'total_resources': counters.library_count,
+            'total_questions': counters.past_questions_count,
+        },
+    }
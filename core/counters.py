@@ -0,0 +1,128 @@
+from django.core.cache import cache
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from .models import (Staff, Exco, PastQuestion, LibraryResource, Testimonial, Announcement,
+                     Student, DepartmentalDues, SiteCounters)
+
+# counter field -> (model, (field, value) a row must have to be counted);
+# counters without a condition count every row
+COUNTER_SOURCES = {
+    'staff_count': (Staff, None),
+    'excos_count': (Exco, None),
+    'past_questions_count': (PastQuestion, None),
+    'library_count': (LibraryResource, None),
+    'testimonials_pending': (Testimonial, ('is_approved', False)),
+    'announcements_active': (Announcement, ('is_active', True)),
+    'total_students': (Student, None),
+    'dues_approved': (DepartmentalDues, ('is_approved', True)),
+    'dues_pending': (DepartmentalDues, ('is_approved', False)),
+}
+
+COUNTED_MODELS = tuple(dict.fromkeys(model for model, _ in COUNTER_SOURCES.values()))
+
+SITE_COUNTERS_PK = 1
+SITE_COUNTERS_CACHE_KEY = 'site_counters'
+# Saves clear the cached row; the timeout bounds how long a change made
+# behind the signals' back (a raw SQL fix, a restored backup) stays hidden
+SITE_COUNTERS_CACHE_TIMEOUT = 60 * 10
+
+
+def _sources_for(model):
+    return {name: condition for name, (source, condition) in COUNTER_SOURCES.items() if source is model}
+
+
+def _count(model, sources):
+    """Exact counts for the given counters of one model, in one query"""
+    return model.objects.aggregate(**{
+        name: Count('pk', filter=Q(**{condition[0]: condition[1]})) if condition else Count('pk')
+        for name, condition in sources.items()
+    })
+
+
+def counted_fields(model):
+    return {condition[0] for condition in _sources_for(model).values() if condition}
+
+
+def counted_state(model, instance):
+    """The values of instance the counters of model depend on"""
+    return {field: getattr(instance, field) for field in counted_fields(model)}
+
+
+def state_before_save(model, instance):
+    """counted_state of the row instance is about to overwrite, or None if it is new"""
+    fields = counted_fields(model)
+    if instance.pk is None:
+        return None
+    if not instance._state.adding and not fields:
+        # An existing row, and nothing but its existence is counted
+        return {}
+    # Explicit primary keys (students) can be new or an existing row
+    stored = model.objects.filter(pk=instance.pk)
+    if not fields:
+        return {} if stored.exists() else None
+    return stored.values(*fields).first()
+
+
+def get_counters():
+    """Return the SiteCounters row, served from cache when possible"""
+    counters = cache.get(SITE_COUNTERS_CACHE_KEY)
+    if counters is None:
+        counters = SiteCounters.objects.filter(pk=SITE_COUNTERS_PK).first()
+        if counters is None:
+            counters, _ = reconcile_counters()
+        cache.set(SITE_COUNTERS_CACHE_KEY, counters, SITE_COUNTERS_CACHE_TIMEOUT)
+    return counters
+
+
+def _update(**values):
+    updated = SiteCounters.objects.filter(pk=SITE_COUNTERS_PK).update(updated_at=timezone.now(), **values)
+    if not updated:
+        reconcile_counters()
+    cache.delete(SITE_COUNTERS_CACHE_KEY)
+
+
+def model_changed(model, before, after):
+    """
+    Move the counters for model by one row changing from before to after,
+    each a counted_state() or None when there is no row (added or removed).
+    Applied as F() deltas, so concurrent saves add up instead of
+    overwriting each other.
+    """
+    values = {}
+    for name, condition in _sources_for(model).items():
+        if condition:
+            field, value = condition
+            delta = (after is not None and after[field] == value) - (before is not None and before[field] == value)
+        else:
+            delta = (after is not None) - (before is not None)
+        if delta:
+            values[name] = F(name) + delta
+    if values:
+        _update(**values)
+
+
+def recount(model):
+    """Recount every counter of model, e.g. after a queryset.update()"""
+    _update(**_count(model, _sources_for(model)))
+
+
+def reconcile_counters():
+    """
+    Recompute every counter from the source tables and store the result.
+    Returns (counters, drift) where drift maps counter name to (stored, actual).
+    """
+    actual = {}
+    for model in COUNTED_MODELS:
+        actual.update(_count(model, _sources_for(model)))
+
+    counters, created = SiteCounters.objects.get_or_create(pk=SITE_COUNTERS_PK, defaults=actual)
+    drift = {}
+    if not created:
+        for name, value in actual.items():
+            stored = getattr(counters, name)
+            if stored != value:
+                drift[name] = (stored, value)
+                setattr(counters, name, value)
+        counters.save()
+    cache.delete(SITE_COUNTERS_CACHE_KEY)
+    return counters, drift
@@ -0,0 +1,43 @@
+from django.utils import timezone
+from .counters import recount
+from .models import DepartmentalDues
+from .receipts import invalidate_receipts
+
+BULK_APPROVE_BATCH = 5000
+
+
+def pending_dues(academic_session=None, level=None):
+    dues = DepartmentalDues.objects.filter(is_approved=False)
+    if academic_session:
+        dues = dues.filter(academic_session=academic_session)
+    if level:
+        dues = dues.filter(student__level=level)
+    return dues
+
+
+def approve_pending(pending, user, batch_size=BULK_APPROVE_BATCH):
+    """
+    Approve every row of the pending queryset, yielding (approved, total)
+    after each UPDATE. Rows are approved batch_size at a time so progress
+    can be shown; a set no larger than batch_size is a single UPDATE.
+    """
+    total = pending.count()
+    now = timezone.now()
+    values = {'is_approved': True, 'approved_by': user, 'approved_at': now, 'updated_at': now}
+    approved = 0
+    try:
+        while True:
+            rows = list(pending.filter(is_approved=False).order_by('pk')
+                        .values_list('pk', 'watermark_code', 'receipt_number')[:batch_size])
+            if rows:
+                approved += (DepartmentalDues.objects.filter(pk__in=[pk for pk, _, _ in rows], is_approved=False)
+                             .update(**values))
+                # The verification page caches "not yet approved" for these codes
+                invalidate_receipts(code for _, *codes in rows for code in codes)
+            yield approved, total
+            if len(rows) < batch_size:
+                break
+    finally:
+        # queryset.update() skips the signals that keep the counters current
+        if approved:
+            recount(DepartmentalDues)
@@ -0,0 +1,181 @@
+# Bulk departmental dues import from CSV or XLSX. Rows are parsed as they
+# are read, matched to students with one in_bulk lookup, given receipt
+# numbers from a single ReceiptSequence block and inserted with
+# bulk_create. Every row that is not imported ends up in the report.
+import csv
+import io
+import uuid
+from decimal import Decimal, InvalidOperation
+from zipfile import BadZipFile
+from django.db import transaction
+from django.utils import timezone
+from .counters import recount
+from .models import DepartmentalDues, ReceiptSequence, Student
+from .receipts import invalidate_receipts
+
+IMPORT_BATCH_SIZE = 500
+REQUIRED_COLUMNS = {'reg_number'}
+# Header aliases seen in bank and portal exports
+COLUMN_ALIASES = {
+    'reg_no': 'reg_number',
+    'registration_number': 'reg_number',
+    'amount': 'amount_paid',
+    'session': 'academic_session',
+    'reference': 'payment_reference',
+    'name': 'full_name',
+    'student_name': 'full_name',
+    'email_address': 'email',
+    'phone_number': 'phone',
+}
+
+
+class ImportFileError(ValueError):
+    pass
+
+
+def _column(header):
+    name = '_'.join(str(header or '').strip().lower().replace('.', ' ').split())
+    return COLUMN_ALIASES.get(name, name)
+
+
+def _csv_rows(upload):
+    reader = csv.reader(io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline=''))
+    try:
+        yield from reader
+    except UnicodeDecodeError:
+        raise ImportFileError('The file is not valid UTF-8 text.')
+    except csv.Error as error:
+        raise ImportFileError(f'The CSV file could not be read at line {reader.line_num}: {error}.')
+
+
+def _xlsx_rows(upload):
+    try:
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+    except ImportError:
+        raise ImportFileError('XLSX import needs the openpyxl package; upload a CSV file instead.')
+    try:
+        sheet = load_workbook(upload, read_only=True, data_only=True).active
+    except (BadZipFile, InvalidFileException, KeyError):
+        raise ImportFileError('The file is not a valid XLSX workbook.')
+    for row in sheet.iter_rows(values_only=True):
+        yield ['' if value is None else str(value) for value in row]
+
+
+def read_rows(upload, required=REQUIRED_COLUMNS):
+    """Yield (line number, {column: value}) for every non-empty data row"""
+    name = upload.name.lower()
+    if name.endswith('.csv'):
+        rows = _csv_rows(upload)
+    elif name.endswith('.xlsx'):
+        rows = _xlsx_rows(upload)
+    else:
+        raise ImportFileError('Upload a .csv or .xlsx file.')
+
+    header = [_column(value) for value in next(rows, [])]
+    missing = set(required) - set(header)
+    if missing:
+        raise ImportFileError(f"Missing column(s): {', '.join(sorted(missing))}.")
+    for line, values in enumerate(rows, start=2):
+        row = {column: str(value).strip() for column, value in zip(header, values) if column}
+        if any(row.values()):
+            yield line, row
+
+
+def _problem(line, row, reason):
+    return {'line': line, 'reg_number': row.get('reg_number', ''), 'reason': reason}
+
+
+def _amount(text, default):
+    """The amount in text (or default when blank) as a Decimal that fits amount_paid, else None"""
+    field = DepartmentalDues._meta.get_field('amount_paid')
+    try:
+        amount = Decimal(text.replace(',', '') or default)
+        if not amount.is_finite() or amount <= 0:
+            return None
+        amount = amount.quantize(Decimal(1).scaleb(-field.decimal_places))
+    except InvalidOperation:
+        return None
+    if amount >= Decimal(10) ** (field.max_digits - field.decimal_places):
+        return None
+    return amount
+
+
+def import_dues(rows, academic_session, amount_paid, approve=False, approved_by=None):
+    """
+    Create DepartmentalDues for rows from read_rows(). Blank session and
+    amount cells fall back to academic_session and amount_paid. Returns a
+    report dict: created dues plus unmatched, duplicate and invalid rows.
+    """
+    report = {'created': [], 'unmatched': [], 'duplicates': [], 'invalid': []}
+    parsed = []
+    seen_students = {}
+    seen_references = {}
+    for line, row in rows:
+        reg_number = row.get('reg_number', '')
+        if not reg_number:
+            report['invalid'].append(_problem(line, row, 'No registration number'))
+            continue
+        amount = _amount(row.get('amount_paid', ''), amount_paid)
+        if amount is None:
+            report['invalid'].append(_problem(line, row, f"Invalid amount \"{row.get('amount_paid')}\""))
+            continue
+        reference = row.get('payment_reference', '')
+        session = row.get('academic_session') or academic_session
+        if len(reference) > DepartmentalDues._meta.get_field('payment_reference').max_length:
+            report['invalid'].append(_problem(line, row, 'Payment reference is too long'))
+            continue
+        if len(session) > DepartmentalDues._meta.get_field('academic_session').max_length:
+            report['invalid'].append(_problem(line, row, 'Academic session is too long'))
+            continue
+        if reg_number in seen_students:
+            report['duplicates'].append(_problem(line, row, f'Same student as line {seen_students[reg_number]}'))
+            continue
+        if reference and reference in seen_references:
+            report['duplicates'].append(_problem(line, row, f'Same payment reference as line {seen_references[reference]}'))
+            continue
+        seen_students[reg_number] = line
+        if reference:
+            seen_references[reference] = line
+        parsed.append((line, row, reg_number, amount, reference, session))
+
+    students = Student.objects.in_bulk([entry[2] for entry in parsed])
+    already_paid = set(DepartmentalDues.objects.filter(student_id__in=list(students))
+                       .values_list('student_id', flat=True))
+    taken_references = set(DepartmentalDues.objects
+                           .filter(payment_reference__in=[entry[4] for entry in parsed if entry[4]])
+                           .values_list('payment_reference', flat=True))
+
+    new_dues = []
+    approved_at = timezone.now() if approve else None
+    for line, row, reg_number, amount, reference, session in parsed:
+        if reg_number not in students:
+            report['unmatched'].append(_problem(line, row, 'No student with this registration number'))
+        elif reg_number in already_paid:
+            report['duplicates'].append(_problem(line, row, 'Student already has a dues record'))
+        elif reference in taken_references:
+            report['duplicates'].append(_problem(line, row, 'Payment reference already recorded'))
+        else:
+            new_dues.append(DepartmentalDues(
+                student=students[reg_number],
+                amount_paid=amount,
+                academic_session=session,
+                payment_reference=reference or f"PAY-{uuid.uuid4().hex[:10].upper()}",
+                watermark_code=f"BME-{uuid.uuid4().hex[:12].upper()}",
+                is_approved=approve,
+                approved_by=approved_by if approve else None,
+                approved_at=approved_at,
+            ))
+
+    if new_dues:
+        # bulk_create skips save() and the signals, so numbers, counters and
+        # cached verifications are handled here
+        with transaction.atomic():
+            for dues, receipt_number in zip(new_dues, ReceiptSequence.allocate(len(new_dues))):
+                dues.receipt_number = receipt_number
+            DepartmentalDues.objects.bulk_create(new_dues, batch_size=IMPORT_BATCH_SIZE)
+        recount(DepartmentalDues)
+        # A code checked before the import is cached as invalid
+        invalidate_receipts(code for dues in new_dues for code in (dues.receipt_number, dues.watermark_code))
+    report['created'] = new_dues
+    return report
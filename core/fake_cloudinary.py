@@ -0,0 +1,75 @@
+# Offline stand-in for the Cloudinary upload API, for load tests and local
+# runs without credentials. Every uploader call goes through
+# cloudinary.uploader.call_api, so replacing that one function covers
+# CloudinaryField uploads, destroys and the rest. Uploads are written under
+# a local folder; delivery URLs are still built by the SDK, without network.
+# Kept free of Django imports so settings can install it.
+import glob
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+import cloudinary.uploader
+
+_original_call_api = cloudinary.uploader.call_api
+
+
+def _store(root, file, params, options):
+    public_id = params.get('public_id') or uuid.uuid4().hex[:20]
+    name = getattr(file, 'name', None) or (file if isinstance(file, str) else '')
+    extension = os.path.splitext(str(name))[1].lstrip('.').lower() or 'jpg'
+    path = os.path.join(root, f'{public_id}.{extension}')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    if hasattr(file, 'read'):
+        if hasattr(file, 'seek'):
+            file.seek(0)
+        content = file.read()
+    elif isinstance(file, bytes):
+        content = file
+    else:
+        # A URL or path to fetch from; nothing to copy offline
+        content = b''
+    with open(path, 'wb') as handle:
+        handle.write(content)
+
+    resource_type = options.get('resource_type') or 'image'
+    version = int(time.time())
+    url = f"http://res.cloudinary.com/{cloudinary.config().cloud_name}/{resource_type}/upload/v{version}/{public_id}.{extension}"
+    return {
+        'public_id': public_id,
+        'version': version,
+        'signature': uuid.uuid4().hex,
+        'width': 0,
+        'height': 0,
+        'format': extension,
+        'resource_type': resource_type,
+        'created_at': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'bytes': len(content),
+        'type': options.get('type') or 'upload',
+        'url': url,
+        'secure_url': url.replace('http://', 'https://', 1),
+        'original_filename': os.path.splitext(os.path.basename(str(name)))[0],
+    }
+
+
+def install_fake_cloudinary(root):
+    """Route every Cloudinary uploader call to files under root instead of the API"""
+    root = str(root)
+
+    def call_api(action, params, http_headers=None, return_error=False, unsigned=False, file=None,
+                 timeout=None, **options):
+        if action == 'upload':
+            return _store(root, file, params, options)
+        if action == 'destroy':
+            stored = glob.glob(os.path.join(root, f"{glob.escape(params.get('public_id') or '')}.*"))
+            for path in stored:
+                os.remove(path)
+            return {'result': 'ok' if stored else 'not found'}
+        return {'result': 'ok'}
+
+    cloudinary.uploader.call_api = call_api
+
+
+def uninstall_fake_cloudinary():
+    cloudinary.uploader.call_api = _original_call_api
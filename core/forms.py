@@ -1,4 +1,6 @@
 from django import forms
+from django.urls import reverse_lazy
+from django.utils.html import format_html
 from .models import( Staff, Exco, PastQuestion, LibraryResource,
                      Testimonial, Announcement, Student, Semester, Course, 
                      DepartmentalDues, CourseHandbook, Timetable, AcademicCalendar
@@ -169,7 +171,9 @@ class CourseForm(forms.ModelForm):
         widgets = {
             'course_code': forms.TextInput(attrs={
                 'class': 'form-control',
-                'placeholder': 'e.g., BME 101'
+                'placeholder': 'e.g., BME 101',
+                'list': 'course-suggestions',
+                'autocomplete': 'off'
             }),
             'course_name': forms.TextInput(attrs={
                 'class': 'form-control',
@@ -184,12 +188,82 @@ class CourseForm(forms.ModelForm):
         }
 
 
+class HandbookSemesterForm(forms.Form):
+    """One grade field per handbook course; courses left blank are skipped"""
+
+    def __init__(self, *args, courses=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.courses = list(courses)
+        for course in self.courses:
+            self.fields[f'grade_{course.pk}'] = forms.TypedChoiceField(
+                label=f"{course.course_code} - {course.course_title}",
+                choices=[('', 'Skip')] + Course.GRADE_CHOICES,
+                coerce=float,
+                empty_value=None,
+                required=False,
+                widget=forms.Select(attrs={'class': 'form-control'}),
+            )
+
+    def course_rows(self):
+        """(handbook course, bound grade field) pairs for the template"""
+        return [(course, self[f'grade_{course.pk}']) for course in self.courses]
+
+    def graded_courses(self):
+        """(handbook course, grade point) for every course given a grade"""
+        return [
+            (course, self.cleaned_data[f'grade_{course.pk}'])
+            for course in self.courses
+            if self.cleaned_data.get(f'grade_{course.pk}') is not None
+        ]
+
+
+class CGPAPlannerForm(forms.Form):
+    target_cgpa = forms.FloatField(
+        min_value=0.0,
+        max_value=5.0,
+        widget=forms.NumberInput(attrs={
+            'class': 'form-control',
+            'step': '0.01',
+            'placeholder': 'e.g., 4.50'
+        })
+    )
+
+
+class StudentAutocompleteWidget(forms.Widget):
+    """
+    Hidden student key plus a search box filled from the student lookup
+    endpoint; unlike a Select it never loads the Student table.
+    """
+    lookup_url = reverse_lazy('student_lookup')
+
+    def label_for(self, value):
+        if value in (None, ''):
+            return ''
+        student = Student.objects.filter(pk=value).values_list('reg_number', 'full_name').first()
+        return f"{student[0]} - {student[1]}" if student else ''
+
+    def render(self, name, value, attrs=None, renderer=None):
+        attrs = self.build_attrs(self.attrs, attrs)
+        input_id = attrs.get('id', f'id_{name}')
+        return format_html(
+            '<div class="position-relative student-autocomplete">'
+            '<input type="hidden" name="{}" id="{}" value="{}">'
+            '<input type="text" id="{}_search" class="{}" value="{}" autocomplete="off" '
+            'placeholder="Search by reg number or name" data-lookup-url="{}" data-target="{}">'
+            '<div id="{}_results" class="list-group position-absolute w-100 shadow-sm" style="z-index: 1000;"></div>'
+            '</div>',
+            name, input_id, value or '',
+            input_id, attrs.get('class', 'form-control'), self.label_for(value), self.lookup_url, input_id,
+            input_id,
+        )
+
+
 class DepartmentalDuesForm(forms.ModelForm):
     class Meta:
         model = DepartmentalDues
         fields = ['student', 'amount_paid', 'academic_session', 'is_approved']
         widgets = {
-            'student': forms.Select(attrs={'class': 'form-control'}),
+            'student': StudentAutocompleteWidget(attrs={'class': 'form-control'}),
             'amount_paid': forms.NumberInput(attrs={
                 'class': 'form-control',
                 'step': '0.01',
@@ -203,6 +277,43 @@ class DepartmentalDuesForm(forms.ModelForm):
         }
 
 
+class DuesImportForm(forms.Form):
+    file = forms.FileField(
+        help_text="CSV or XLSX with a reg_number column; amount_paid, academic_session and payment_reference are optional",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'})
+    )
+    academic_session = forms.CharField(
+        max_length=20,
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'e.g., 2023/2024'
+        })
+    )
+    amount_paid = forms.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        initial=5000,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'})
+    )
+    approve = forms.BooleanField(
+        required=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+
+
+class RosterImportForm(forms.Form):
+    file = forms.FileField(
+        help_text="CSV or XLSX with reg_number and full_name columns; email, phone and level are optional",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'})
+    )
+    level = forms.ChoiceField(
+        choices=Student.LEVEL_CHOICES,
+        initial='100',
+        help_text="Used for rows with a blank level",
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+
+
 class CourseHandbookForm(forms.ModelForm):
     class Meta:
         model = CourseHandbook
@@ -0,0 +1,184 @@
+# HTTP load tests against a running server. Virtual users (one thread and
+# cookie jar each) replay weighted visitor, student and admin journeys
+# until the time is up; every response is timed and its X-Query-Count
+# header (see core.querybudget) recorded. summarize() turns the samples
+# into latency percentiles, throughput and queries per request, and
+# compare() checks them against a stored baseline.
+import http.cookiejar
+import random
+import re
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from django.urls import reverse
+from .analytics import percentile
+from .querybudget import QUERY_COUNT_HEADER
+
+# Journey -> share of virtual user sessions
+JOURNEY_WEIGHTS = {'visitor': 50, 'student': 35, 'admin': 15}
+ADMIN_PAGES = ['admin_dashboard', 'manage_departmental_dues', 'manage_staff', 'manage_pastquestions',
+               'manage_library', 'manage_course_handbook']
+PERCENTILES = (50, 95, 99)
+REQUEST_TIMEOUT = 30
+CSRF_INPUT = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # Each page is timed on its own, so redirects are not followed
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class VirtualUser:
+    def __init__(self, base_url, samples, lock):
+        self.base_url = base_url.rstrip('/')
+        self.samples = samples
+        self.lock = lock
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect
+        )
+
+    def request(self, name, path, data=None, record=True):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        request = urllib.request.Request(self.base_url + path, data=body)
+        started = time.perf_counter()
+        try:
+            with self.opener.open(request, timeout=REQUEST_TIMEOUT) as response:
+                status, headers, content = response.status, response.headers, response.read()
+        except urllib.error.HTTPError as error:
+            status, headers, content = error.code, error.headers, error.read()
+        except OSError:
+            status, headers, content = 0, {}, b''
+        elapsed = time.perf_counter() - started
+        if record:
+            queries = headers.get(QUERY_COUNT_HEADER)
+            with self.lock:
+                self.samples.append((name, status, elapsed, int(queries) if queries else None))
+        return status, content
+
+    def post_form(self, name, page, fields):
+        """GET a form page for its CSRF token, then POST fields to it"""
+        path = reverse(page)
+        status, content = self.request(name + '_form', path)
+        token = CSRF_INPUT.search(content.decode(errors='replace'))
+        if token:
+            fields = {'csrfmiddlewaretoken': token.group(1), **fields}
+        return self.request(name, path, fields)
+
+
+def visitor_journey(user, rng, accounts):
+    for name in ('index', 'past_questions', 'library', 'view_course_handbook'):
+        user.request(name, reverse(name))
+
+
+def student_journey(user, rng, accounts):
+    user.post_form('student_login', 'student_login', {'reg_number': rng.choice(accounts['students'])})
+    for name in ('student_dashboard', 'calculate_cgpa', 'print_receipt'):
+        user.request(name, reverse(name))
+    user.request('student_logout', reverse('student_logout'))
+
+
+def admin_journey(user, rng, accounts):
+    username, password = accounts['admin']
+    user.post_form('admin_login', 'admin_login', {'username': username, 'password': password})
+    for name in rng.sample(ADMIN_PAGES, 3):
+        user.request(name, reverse(name))
+
+
+JOURNEYS = {'visitor': visitor_journey, 'student': student_journey, 'admin': admin_journey}
+
+
+def wait_until_ready(base_url, timeout=30):
+    """Poll the home page until the server answers; False if it never does"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(base_url.rstrip('/') + reverse('index'), timeout=2):
+                return True
+        except urllib.error.HTTPError:
+            return True
+        except OSError:
+            time.sleep(0.25)
+    return False
+
+
+def run(base_url, accounts, concurrency=8, duration=30, seed=0):
+    """Run concurrency virtual users for duration seconds; returns (samples, elapsed seconds)"""
+    samples = []
+    lock = threading.Lock()
+    # Without admin credentials, only visitors and students
+    journeys, weights = zip(*[(journey, weight) for journey, weight in JOURNEY_WEIGHTS.items()
+                              if journey != 'admin' or accounts['admin']])
+
+    # One unrecorded pass of each journey so first-hit costs stay out of the numbers
+    warm = VirtualUser(base_url, [], lock)
+    warm.request = lambda *args, _request=warm.request, **kwargs: _request(*args, **{**kwargs, 'record': False})
+    for journey in journeys:
+        JOURNEYS[journey](warm, random.Random(seed), accounts)
+
+    started = time.monotonic()
+    deadline = started + duration
+
+    def worker(number):
+        rng = random.Random(seed * 1000 + number)
+        while time.monotonic() < deadline:
+            user = VirtualUser(base_url, samples, lock)
+            JOURNEYS[rng.choices(journeys, weights=weights)[0]](user, rng, accounts)
+
+    threads = [threading.Thread(target=worker, args=(number,), daemon=True) for number in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.monotonic() - started
+
+
+def _stats(rows, elapsed):
+    latencies = sorted(row[2] * 1000 for row in rows)
+    queries = [row[3] for row in rows if row[3] is not None]
+    stats = {
+        'requests': len(rows),
+        'errors': sum(1 for row in rows if row[1] == 0 or row[1] >= 500),
+        'rps': round(len(rows) / elapsed, 2),
+        'mean_queries': round(sum(queries) / len(queries), 2) if queries else None,
+        'median_queries': float(statistics.median(queries)) if queries else None,
+    }
+    stats.update({f'p{q}': round(percentile(latencies, q), 1) for q in PERCENTILES})
+    return stats
+
+
+def summarize(samples, elapsed):
+    """Latency percentiles (ms), throughput and queries per request, overall and per page"""
+    by_name = {}
+    for row in samples:
+        by_name.setdefault(row[0], []).append(row)
+    return {
+        'elapsed': round(elapsed, 1),
+        'total': _stats(samples, elapsed) if samples else {},
+        'endpoints': {name: _stats(rows, elapsed) for name, rows in sorted(by_name.items())},
+    }
+
+
+def compare(result, baseline, tolerance=0.25):
+    """
+    Regressions against baseline: p95 slower by more than tolerance, new
+    errors, or more queries. Queries are compared by their median, since the
+    mean and the maximum move with how many requests missed a worker's cache.
+    """
+    regressions = []
+    for name, stats in result['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(name)
+        if before is None:
+            continue
+        if stats['p95'] > before['p95'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {stats['p95']}ms, baseline {before['p95']}ms")
+        if stats['median_queries'] is not None and before.get('median_queries') is not None \
+                and stats['median_queries'] > before['median_queries']:
+            regressions.append(f"{name}: {stats['median_queries']} queries per request, "
+                               f"baseline {before['median_queries']}")
+        if stats['errors'] and not before['errors']:
+            regressions.append(f"{name}: {stats['errors']} error(s), baseline had none")
+    return regressions
@@ -0,0 +1,38 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.cgpa import compact_history
+
+
+class Command(BaseCommand):
+    help = "Collapse old CGPA calculation history into one snapshot per student per session"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-days',
+            type=int,
+            default=180,
+            help="Keep every calculation newer than this many days (default: 180)",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Rows deleted per DELETE statement (default: 1000)",
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Only report how many rows would be removed",
+        )
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options['keep_days'])
+        removed = compact_history(before, batch_size=options['batch_size'], dry_run=options['dry_run'])
+
+        if options['dry_run']:
+            self.stdout.write(f"{removed} calculation(s) older than {before:%Y-%m-%d} would be removed.")
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Removed {removed} calculation(s) older than {before:%Y-%m-%d}."
+            ))
@@ -0,0 +1,42 @@
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from core.dues_import import read_rows, ImportFileError
+from core.models import Student
+from core.roster_import import import_roster, ROSTER_BATCH_SIZE, ROSTER_COLUMNS
+
+
+class Command(BaseCommand):
+    help = "Register students from a CSV or XLSX roster with reg_number and full_name columns"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Roster file (.csv or .xlsx)")
+        parser.add_argument(
+            '--level',
+            choices=[value for value, _ in Student.LEVEL_CHOICES],
+            default='100',
+            help="Level for rows with a blank level (default: 100)",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=ROSTER_BATCH_SIZE,
+            help=f"Rows validated and inserted per batch (default: {ROSTER_BATCH_SIZE})",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as handle:
+                rows = read_rows(File(handle), required=ROSTER_COLUMNS)
+                report = import_roster(rows, level=options['level'], batch_size=options['batch_size'])
+        except OSError as error:
+            raise CommandError(error)
+        except ImportFileError as error:
+            raise CommandError(f"{options['path']}: {error}")
+
+        for status in ('existing', 'duplicates', 'invalid'):
+            for row in report[status]:
+                self.stdout.write(f"line {row['line']} {row['reg_number']}: {row['reason']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Registered {report['created']} student(s); skipped {len(report['existing'])} already registered, "
+            f"{len(report['duplicates'])} duplicate and {len(report['invalid'])} invalid row(s)."
+        ))
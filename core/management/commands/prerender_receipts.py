@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from core.models import DepartmentalDues
+from core.receipt_pdf import render_receipt_pdf
+
+
+class Command(BaseCommand):
+    help = "Render the PDF receipt of every approved dues record in a session into the cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--session', required=True, help="Academic session, e.g. 2023/2024")
+        parser.add_argument(
+            '--base-url',
+            default='',
+            help="Site address used in the verification link, e.g. https://bmefuto.example; "
+                 "must match the address students download from",
+        )
+
+    def handle(self, *args, **options):
+        rendered = 0
+        dues_list = (DepartmentalDues.objects
+                     .filter(academic_session=options['session'], is_approved=True)
+                     .select_related('student', 'approved_by')
+                     .iterator(chunk_size=500))
+        for dues in dues_list:
+            render_receipt_pdf(dues, options['base_url'])
+            rendered += 1
+        self.stdout.write(self.style.SUCCESS(f"Rendered {rendered} receipt(s)."))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.cgpa import rebuild_totals
+
+
+class Command(BaseCommand):
+    help = "Rebuild stored semester totals and CGPA summaries from the course records"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help="Only report inconsistencies; exit with an error if any are found",
+        )
+
+    def handle(self, *args, **options):
+        check_only = options['check']
+        semesters, summaries = rebuild_totals(fix=not check_only)
+
+        for semester in semesters:
+            self.stdout.write(f"Semester {semester.pk} ({semester.student_id} - {semester.name}) out of date")
+        for summary in summaries:
+            self.stdout.write(f"CGPA summary for {summary.student_id} out of date")
+
+        if check_only and (semesters or summaries):
+            raise CommandError(
+                f"{len(semesters)} semester(s) and {len(summaries)} CGPA summaries are inconsistent."
+            )
+
+        if check_only:
+            self.stdout.write(self.style.SUCCESS("CGPA totals are consistent."))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"CGPA totals rebuilt ({len(semesters)} semester(s), {len(summaries)} summaries updated)."
+            ))
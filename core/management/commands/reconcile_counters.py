@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from core.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = "Recount the site statistics and correct any drift in SiteCounters"
+
+    def handle(self, *args, **options):
+        counters, drift = reconcile_counters()
+
+        for name, (stored, actual) in sorted(drift.items()):
+            self.stdout.write(f"{name}: {stored} -> {actual}")
+
+        if drift:
+            self.stdout.write(self.style.WARNING(f"Corrected {len(drift)} counter(s)."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Site counters are up to date."))
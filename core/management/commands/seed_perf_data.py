@@ -0,0 +1,79 @@
+import time
+from django.core.management.base import BaseCommand
+from core.perf_data import flush, seed_perf_data
+
+
+class Command(BaseCommand):
+    help = "Generate production-shaped students, results, dues and library rows for benchmarking"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=10000, help="Students to create (default: 10000)")
+        parser.add_argument(
+            '--semesters',
+            type=int,
+            default=10,
+            help="Most semesters per student; each has as many as their level allows (default: 10)",
+        )
+        parser.add_argument('--courses', type=int, default=8, help="Courses per semester (default: 8)")
+        parser.add_argument(
+            '--full-history',
+            action='store_true',
+            help="Give every student all --semesters semesters, as final year students",
+        )
+        parser.add_argument(
+            '--calculations',
+            type=int,
+            default=3,
+            help="CGPA calculations kept per student (default: 3)",
+        )
+        parser.add_argument(
+            '--dues-rate',
+            type=float,
+            default=0.8,
+            help="Share of students who have paid dues (default: 0.8)",
+        )
+        parser.add_argument(
+            '--approved-rate',
+            type=float,
+            default=0.75,
+            help="Share of paid dues already approved (default: 0.75)",
+        )
+        parser.add_argument('--past-questions', type=int, default=1000, help="Past questions (default: 1000)")
+        parser.add_argument('--library', type=int, default=300, help="Library resources (default: 300)")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed; the same seed gives the same data")
+        parser.add_argument(
+            '--session',
+            type=int,
+            help="Start year of the current academic session (default: the session today falls in)",
+        )
+        parser.add_argument(
+            '--flush',
+            action='store_true',
+            help="Delete previously generated rows first",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options['flush']:
+            flush()
+            self.stdout.write("Removed previously generated rows.")
+
+        def progress(done, total):
+            self.stdout.write(f"{done}/{total} students")
+
+        counts = seed_perf_data(
+            students=options['students'],
+            semesters=options['semesters'],
+            courses=options['courses'],
+            full_history=options['full_history'],
+            calculations=options['calculations'],
+            dues_rate=options['dues_rate'],
+            approved_rate=options['approved_rate'],
+            past_questions=options['past_questions'],
+            resources=options['library'],
+            seed=options['seed'],
+            session_start=options['session'],
+            progress=progress,
+        )
+        summary = ', '.join(f"{count} {name.replace('_', ' ')}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Created {summary} in {time.monotonic() - started:.1f}s."))
@@ -0,0 +1,79 @@
+from django.core.cache import cache, caches
+from django.core.cache.backends.db import DatabaseCache
+from django.db import router
+from django.utils.functional import SimpleLazyObject
+from .models import Student
+
+STUDENT_SESSION_KEY = 'student_reg_number'
+STUDENT_CACHE_TIMEOUT = 60 * 15
+
+
+def student_cache_key(reg_number):
+    return f'student:{reg_number}'
+
+
+def caches_students():
+    """
+    Whether students are kept in the cache. A DatabaseCache read is a query
+    like the Student SELECT it would replace, and every set adds a cull
+    COUNT(*), so with that backend the student is read directly.
+    """
+    return not isinstance(caches['default'], DatabaseCache)
+
+
+def invalidate_student(reg_number):
+    if caches_students():
+        cache.delete(student_cache_key(reg_number))
+
+
+def _snapshot(student):
+    """Compact, picklable copy of the concrete field values"""
+    return {
+        field.attname: field.get_prep_value(field.value_from_object(student))
+        for field in Student._meta.concrete_fields
+    }
+
+
+def _from_snapshot(snapshot):
+    fields = Student._meta.concrete_fields
+    values = [field.to_python(snapshot[field.attname]) for field in fields]
+    return Student.from_db(
+        router.db_for_read(Student),
+        [field.attname for field in fields],
+        values,
+    )
+
+
+def load_student(reg_number):
+    """Return the Student for reg_number, served from cache when possible"""
+    if not reg_number:
+        return None
+    if not caches_students():
+        return Student.objects.filter(reg_number=reg_number).first()
+
+    key = student_cache_key(reg_number)
+    snapshot = cache.get(key)
+    if snapshot is not None:
+        return _from_snapshot(snapshot)
+
+    student = Student.objects.filter(reg_number=reg_number).first()
+    if student is not None:
+        cache.set(key, _snapshot(student), STUDENT_CACHE_TIMEOUT)
+    return student
+
+
+def get_student(request):
+    if not hasattr(request, '_cached_student'):
+        request._cached_student = load_student(request.session.get(STUDENT_SESSION_KEY))
+    return request._cached_student
+
+
+class StudentMiddleware:
+    """Attach the logged-in student to the request, resolved lazily at most once"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.student = SimpleLazyObject(lambda: get_student(request))
+        return self.get_response(request)
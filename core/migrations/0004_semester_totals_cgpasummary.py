@@ -0,0 +1,86 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_totals(apps, schema_editor):
+    Semester = apps.get_model('core', 'Semester')
+    CGPASummary = apps.get_model('core', 'CGPASummary')
+
+    semesters = Semester.objects.annotate(
+        computed_courses=models.Count('courses'),
+        computed_credits=models.Sum('courses__credit_unit'),
+        computed_points=models.Sum(
+            models.F('courses__credit_unit') * models.F('courses__grade_point'),
+            output_field=models.FloatField(),
+        ),
+    )
+    per_student = {}
+    updated = []
+    for semester in semesters.iterator():
+        credits = semester.computed_credits or 0
+        points = semester.computed_points or 0.0
+        semester.courses_count = semester.computed_courses
+        semester.total_credits = credits
+        semester.total_points = points
+        semester.gpa = round(points / credits, 2) if credits > 0 else 0.0
+        updated.append(semester)
+        student_credits, student_points = per_student.get(semester.student_id, (0, 0.0))
+        per_student[semester.student_id] = (student_credits + credits, student_points + points)
+
+    Semester.objects.bulk_update(updated, ['courses_count', 'total_credits', 'total_points', 'gpa'], batch_size=500)
+    CGPASummary.objects.bulk_create([
+        CGPASummary(
+            student_id=student_id,
+            total_credits=credits,
+            total_points=points,
+            cgpa=round(points / credits, 2) if credits > 0 else 0.0,
+        )
+        for student_id, (credits, points) in per_student.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_timetable_departmentaldues_academiccalendar_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='semester',
+            name='courses_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='semester',
+            name='gpa',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='semester',
+            name='total_credits',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='semester',
+            name='total_points',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.CreateModel(
+            name='CGPASummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_credits', models.IntegerField(default=0)),
+                ('total_points', models.FloatField(default=0.0)),
+                ('cgpa', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='cgpa_summary', to='core.student')),
+            ],
+            options={
+                'verbose_name_plural': 'CGPA Summaries',
+            },
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_semester_totals_cgpasummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteCounters',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('staff_count', models.IntegerField(default=0)),
+                ('excos_count', models.IntegerField(default=0)),
+                ('past_questions_count', models.IntegerField(default=0)),
+                ('library_count', models.IntegerField(default=0)),
+                ('testimonials_pending', models.IntegerField(default=0)),
+                ('announcements_active', models.IntegerField(default=0)),
+                ('total_students', models.IntegerField(default=0)),
+                ('dues_approved', models.IntegerField(default=0)),
+                ('dues_pending', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Site Counters',
+            },
+        ),
+    ]
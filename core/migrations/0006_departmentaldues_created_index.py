@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_sitecounters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='departmentaldues',
+            index=models.Index(fields=['-created_at', '-id'], name='core_dues_created_idx'),
+        ),
+    ]
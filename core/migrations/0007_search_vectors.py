@@ -0,0 +1,63 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:24
+
+from functools import reduce
+from operator import add
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+SEARCH_WEIGHTS = {
+    'pastquestion': {'course_code': 'A', 'course_title': 'A', 'description': 'C'},
+    'libraryresource': {'title': 'A', 'author': 'B', 'description': 'C'},
+    'coursehandbook': {'course_code': 'A', 'course_title': 'A', 'description': 'C'},
+}
+
+
+def create_search_indexes(apps, schema_editor):
+    # tsvector columns and GIN indexes only mean something on PostgreSQL;
+    # other databases search through the in-process index in core.search.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, weights in SEARCH_WEIGHTS.items():
+        model = apps.get_model('core', model_name)
+        table = model._meta.db_table
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{table}_search_gin" ON "{table}" USING gin ("search_vector")'
+        )
+        model.objects.update(search_vector=reduce(add, [
+            SearchVector(field, weight=weight, config='english') for field, weight in weights.items()
+        ]))
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name in SEARCH_WEIGHTS:
+        table = apps.get_model('core', model_name)._meta.db_table
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{table}_search_gin"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_departmentaldues_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coursehandbook',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='libraryresource',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='pastquestion',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
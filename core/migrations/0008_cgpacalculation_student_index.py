@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 21:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_search_vectors'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cgpacalculation',
+            index=models.Index(fields=['student', '-calculated_at'], name='core_cgpacalc_student_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-18 21:20
+
+from django.db import migrations, models
+
+
+def seed_sequences(apps, schema_editor):
+    # Start each year's sequence after the highest BME/{year}/NNNN already issued
+    DepartmentalDues = apps.get_model('core', 'DepartmentalDues')
+    ReceiptSequence = apps.get_model('core', 'ReceiptSequence')
+
+    last_numbers = {}
+    for receipt_number in DepartmentalDues.objects.values_list('receipt_number', flat=True).iterator():
+        parts = receipt_number.split('/')
+        if len(parts) == 3 and parts[0] == 'BME' and parts[1].isdigit() and parts[2].isdigit():
+            year, number = int(parts[1]), int(parts[2])
+            last_numbers[year] = max(last_numbers.get(year, 0), number)
+
+    ReceiptSequence.objects.bulk_create([
+        ReceiptSequence(year=year, last_number=number) for year, number in last_numbers.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_cgpacalculation_student_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReceiptSequence',
+            fields=[
+                ('year', models.IntegerField(primary_key=True, serialize=False)),
+                ('last_number', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-year'],
+            },
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:35
+
+import uuid
+from django.db import migrations, models
+
+
+def fill_missing_watermarks(apps, schema_editor):
+    # Give blank or repeated codes a fresh one so the unique index can be built
+    DepartmentalDues = apps.get_model('core', 'DepartmentalDues')
+    seen = set()
+    for dues in DepartmentalDues.objects.order_by('pk').only('pk', 'watermark_code').iterator():
+        if not dues.watermark_code or dues.watermark_code in seen:
+            dues.watermark_code = f"BME-{uuid.uuid4().hex[:12].upper()}"
+            dues.save(update_fields=['watermark_code'])
+        seen.add(dues.watermark_code)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_student_prefix_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_missing_watermarks, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='departmentaldues',
+            name='watermark_code',
+            field=models.CharField(blank=True, help_text='Unique code for verification', max_length=100, unique=True),
+        ),
+    ]
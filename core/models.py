@@ -1,5 +1,7 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
+from django.contrib.postgres.search import SearchVectorField
 from cloudinary.models import CloudinaryField
 from django.core.validators import FileExtensionValidator
 import uuid
@@ -66,6 +68,8 @@ class PastQuestion(models.Model):
     link = models.URLField(help_text="Google Drive, Dropbox, or any other link to the file")
     description = models.TextField(blank=True, null=True)
     uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    # Full-text search document, maintained on PostgreSQL by core.search
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -94,6 +98,8 @@ class LibraryResource(models.Model):
     cover_image = CloudinaryField('image', blank=True, null=True)
     level = models.CharField(max_length=10, blank=True, null=True)
     uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    # Full-text search document, maintained on PostgreSQL by core.search
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -155,6 +161,14 @@ class Student(models.Model):
 
     class Meta:
         ordering = ['reg_number']
+        indexes = [
+            # Prefix (LIKE 'abc%') lookups for the student picker; the
+            # pattern opclass only applies on PostgreSQL
+            models.Index(fields=['reg_number'], name='core_student_reg_prefix_idx',
+                         opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['full_name'], name='core_student_name_prefix_idx',
+                         opclasses=['varchar_pattern_ops']),
+        ]
 
     def __str__(self):
         return f"{self.reg_number} - {self.full_name}"
@@ -164,6 +178,11 @@ class Semester(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='semesters')
     name = models.CharField(max_length=100, help_text="e.g., 100 Level First Semester")
     year = models.CharField(max_length=20, blank=True, null=True)
+    # Running totals maintained by core.cgpa whenever a course changes
+    courses_count = models.IntegerField(default=0)
+    total_credits = models.IntegerField(default=0)
+    total_points = models.FloatField(default=0.0)
+    gpa = models.FloatField(default=0.0)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -171,20 +190,11 @@ class Semester(models.Model):
         unique_together = ['student', 'name']
 
     def __str__(self):
-        return f"{self.student.reg_number} - {self.name}"
+        return f"{self.student_id} - {self.name}"
 
     def calculate_gpa(self):
-        """Calculate GPA for this semester"""
-        courses = self.courses.all()
-        if not courses:
-            return 0.0
-        
-        total_credits = sum(course.credit_unit for course in courses)
-        if total_credits == 0:
-            return 0.0
-        
-        total_points = sum(course.credit_unit * course.grade_point for course in courses)
-        return round(total_points / total_credits, 2)
+        """Return the stored GPA for this semester"""
+        return self.gpa
 
 
 class Course(models.Model):
@@ -225,9 +235,25 @@ class CGPACalculation(models.Model):
 
     class Meta:
         ordering = ['-calculated_at']
+        indexes = [models.Index(fields=['student', '-calculated_at'], name='core_cgpacalc_student_idx')]
 
     def __str__(self):
-        return f"{self.student.reg_number} - CGPA: {self.cgpa}"
+        return f"{self.student_id} - CGPA: {self.cgpa}"
+
+
+class CGPASummary(models.Model):
+    """Running CGPA totals for a student, kept in step with their semesters"""
+    student = models.OneToOneField(Student, on_delete=models.CASCADE, related_name='cgpa_summary')
+    total_credits = models.IntegerField(default=0)
+    total_points = models.FloatField(default=0.0)
+    cgpa = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "CGPA Summaries"
+
+    def __str__(self):
+        return f"{self.student_id} - CGPA: {self.cgpa}"
 
 
 # DEPARTMENTAL DUES RECEIPT MODEL
@@ -240,31 +266,19 @@ class DepartmentalDues(models.Model):
     approved_at = models.DateTimeField(null=True, blank=True)
     academic_session = models.CharField(max_length=20, help_text="e.g., 2023/2024")
     receipt_number = models.CharField(max_length=50, unique=True, blank=True)
-    watermark_code = models.CharField(max_length=100, blank=True, help_text="Unique code for verification")
+    watermark_code = models.CharField(max_length=100, unique=True, blank=True, help_text="Unique code for verification")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = "Departmental Dues"
+        indexes = [
+            # Serves keyset pagination of the dues table (ordering + pk)
+            models.Index(fields=['-created_at', '-id'], name='core_dues_created_idx'),
+        ]
     
     def save(self, *args, **kwargs):
-        if not self.receipt_number:
-            # Generate unique receipt number: BME/2024/001
-            import datetime
-            year = datetime.datetime.now().year
-            last_receipt = DepartmentalDues.objects.filter(
-                receipt_number__startswith=f'BME/{year}/'
-            ).order_by('-receipt_number').first()
-            
-            if last_receipt:
-                last_number = int(last_receipt.receipt_number.split('/')[-1])
-                new_number = last_number + 1
-            else:
-                new_number = 1
-            
-            self.receipt_number = f'BME/{year}/{new_number:04d}'
-        
         if not self.watermark_code:
             # Generate unique watermark code for anti-fraud
             self.watermark_code = f"BME-{uuid.uuid4().hex[:12].upper()}"
@@ -272,10 +286,51 @@ class DepartmentalDues(models.Model):
         if not self.payment_reference:
             self.payment_reference = f"PAY-{uuid.uuid4().hex[:10].upper()}"
         
-        super().save(*args, **kwargs)
+        if self.receipt_number:
+            super().save(*args, **kwargs)
+            return
+        
+        # Generate unique receipt number: BME/2024/0001. Allocated in the same
+        # transaction as the insert so a failed save gives the number back.
+        with transaction.atomic():
+            self.receipt_number = ReceiptSequence.allocate()[0]
+            super().save(*args, **kwargs)
+    
+    def __str__(self):
+        return f"{self.student_id} - {self.receipt_number}"
+
+
+class ReceiptSequence(models.Model):
+    """Last receipt number handed out in each year"""
+    year = models.IntegerField(primary_key=True)
+    last_number = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-year']
     
     def __str__(self):
-        return f"{self.student.reg_number} - {self.receipt_number}"
+        return f"{self.year}: {self.last_number}"
+    
+    @staticmethod
+    def format(year, number):
+        return f'BME/{year}/{number:04d}'
+    
+    @classmethod
+    def allocate(cls, count=1, year=None):
+        """
+        Reserve the next count receipt numbers for year (default: this year)
+        and return them in order. The row update takes the lock, so
+        concurrent callers always get disjoint blocks.
+        """
+        year = year or timezone.localdate().year
+        with transaction.atomic():
+            bump = {'last_number': models.F('last_number') + count, 'updated_at': timezone.now()}
+            if not cls.objects.filter(year=year).update(**bump):
+                cls.objects.get_or_create(year=year)
+                cls.objects.filter(year=year).update(**bump)
+            last = cls.objects.filter(year=year).values_list('last_number', flat=True).get()
+        return [cls.format(year, number) for number in range(last - count + 1, last + 1)]
 
 
 # COURSE HANDBOOK MODEL
@@ -305,6 +360,8 @@ class CourseHandbook(models.Model):
     ], default='Core')
     description = models.TextField(blank=True, null=True)
     uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    # Full-text search document, maintained on PostgreSQL by core.search
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -384,4 +441,29 @@ class AcademicCalendar(models.Model):
         # If this calendar is being set as active, deactivate all others
         if self.is_active:
             AcademicCalendar.objects.filter(is_active=True).exclude(pk=self.pk).update(is_active=False)
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+
+# SITE STATISTICS
+class SiteCounters(models.Model):
+    """Single row of maintained counts read by the homepage and admin dashboard"""
+    staff_count = models.IntegerField(default=0)
+    excos_count = models.IntegerField(default=0)
+    past_questions_count = models.IntegerField(default=0)
+    library_count = models.IntegerField(default=0)
+    testimonials_pending = models.IntegerField(default=0)
+    announcements_active = models.IntegerField(default=0)
+    total_students = models.IntegerField(default=0)
+    dues_approved = models.IntegerField(default=0)
+    dues_pending = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Site Counters"
+
+    def __str__(self):
+        return f"Site counters (updated {self.updated_at:%Y-%m-%d %H:%M})"
+
+    @property
+    def dues_total(self):
+        return self.dues_approved + self.dues_pending
@@ -0,0 +1,178 @@
+import binascii
+import json
+from functools import reduce
+from operator import or_
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+CURSOR_PARAM = 'cursor'
+PAGE_SIZE_PARAM = 'per_page'
+# Below this many rows an exact COUNT(*) is cheap enough
+ESTIMATED_COUNT_THRESHOLD = 100000
+
+
+def _ordering(queryset):
+    """
+    Return [(field, descending), ...] for the queryset's ordering (falling
+    back to Meta.ordering) with the primary key appended as a tiebreaker.
+    Ordering fields must be non-null concrete fields of the model.
+    """
+    opts = queryset.model._meta
+    ordering = []
+    for name in queryset.query.order_by or opts.ordering:
+        descending = name.startswith('-')
+        field = opts.pk if name.lstrip('-') == 'pk' else opts.get_field(name.lstrip('-'))
+        ordering.append((field, descending))
+    if not any(field == opts.pk for field, _ in ordering):
+        # Follow the last column's direction so a composite index can serve both
+        ordering.append((opts.pk, ordering[-1][1] if ordering else False))
+    return ordering
+
+
+def _order_by(ordering, reverse=False):
+    return [('-' if descending != reverse else '') + field.attname for field, descending in ordering]
+
+
+def _seek(ordering, values, reverse=False):
+    """Rows strictly after values in ordering (before them when reverse)"""
+    clauses = []
+    for i, (field, descending) in enumerate(ordering):
+        lookup = 'lt' if descending != reverse else 'gt'
+        clause = Q(**{f'{field.attname}__{lookup}': values[i]})
+        for (earlier, _), value in zip(ordering[:i], values[:i]):
+            clause &= Q(**{earlier.attname: value})
+        clauses.append(clause)
+    return reduce(or_, clauses)
+
+
+def _json_default(value):
+    # Full precision isoformat; DjangoJSONEncoder would drop microseconds
+    # and break equality on timestamp columns.
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_cursor(direction, values):
+    payload = json.dumps([direction, values], default=_json_default, separators=(',', ':'))
+    return urlsafe_base64_encode(payload.encode())
+
+
+def decode_cursor(cursor, ordering):
+    """Return (direction, values) or None if the cursor is missing or malformed"""
+    if not cursor:
+        return None
+    try:
+        direction, raw_values = json.loads(urlsafe_base64_decode(cursor))
+        if direction not in ('next', 'prev') or len(raw_values) != len(ordering):
+            return None
+        values = [field.to_python(value) for (field, _), value in zip(ordering, raw_values)]
+    except (ValueError, TypeError, ValidationError, binascii.Error):
+        return None
+    return direction, values
+
+
+def get_page_size(request, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    try:
+        size = int(request.GET.get(PAGE_SIZE_PARAM, default))
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, maximum))
+
+
+class KeysetPage:
+    """One page of rows plus the cursors for its neighbours"""
+
+    def __init__(self, request, object_list, ordering, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self._request = request
+        self._ordering = ordering
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def _cursor(self, direction, obj):
+        return encode_cursor(direction, [getattr(obj, field.attname) for field, _ in self._ordering])
+
+    def _query(self, cursor):
+        params = self._request.GET.copy()
+        params[CURSOR_PARAM] = cursor
+        return params.urlencode()
+
+    @property
+    def next_query(self):
+        if not self.has_next:
+            return ''
+        return self._query(self._cursor('next', self.object_list[-1]))
+
+    @property
+    def previous_query(self):
+        if not self.has_previous:
+            return ''
+        if len(self.object_list) == 0:
+            # Stepped past the end; drop the cursor to go back to the start
+            params = self._request.GET.copy()
+            params.pop(CURSOR_PARAM, None)
+            return params.urlencode()
+        return self._query(self._cursor('prev', self.object_list[0]))
+
+
+def paginate_keyset(request, queryset, per_page=None):
+    """
+    Cursor-paginate queryset by its ordering plus pk. The page is read from
+    the ?cursor= and ?per_page= query parameters.
+    """
+    ordering = _ordering(queryset)
+    size = per_page or get_page_size(request)
+    cursor = decode_cursor(request.GET.get(CURSOR_PARAM), ordering)
+
+    if cursor is None:
+        rows = list(queryset.order_by(*_order_by(ordering))[:size + 1])
+        return KeysetPage(request, rows[:size], ordering, len(rows) > size, False)
+
+    direction, values = cursor
+    if direction == 'next':
+        rows = list(queryset.filter(_seek(ordering, values)).order_by(*_order_by(ordering))[:size + 1])
+        return KeysetPage(request, rows[:size], ordering, len(rows) > size, True)
+
+    rows = list(queryset.filter(_seek(ordering, values, reverse=True))
+                .order_by(*_order_by(ordering, reverse=True))[:size + 1])
+    has_previous = len(rows) > size
+    rows = rows[:size]
+    rows.reverse()
+    return KeysetPage(request, rows, ordering, True, has_previous)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for large admin changelists. An unfiltered queryset on
+    PostgreSQL takes its count from the planner's table statistics instead
+    of a full COUNT(*) once the table is past ESTIMATED_COUNT_THRESHOLD rows.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                               [queryset.model._meta.db_table])
+                row = cursor.fetchone()
+            if row and row[0] >= ESTIMATED_COUNT_THRESHOLD:
+                return int(row[0])
+        return super().count
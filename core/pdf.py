@@ -0,0 +1,103 @@
+# Receipt PDF drawing. Kept free of Django imports; callers pass the plain
+# dict built by receipt_pdf.receipt_data.
+from io import BytesIO
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfgen import canvas
+
+PRIMARY = colors.HexColor('#0d6efd')
+SUCCESS = colors.HexColor('#198754')
+MUTED = colors.HexColor('#6c757d')
+
+
+def _row(pdf, y, label, value):
+    pdf.setFont('Helvetica-Bold', 10)
+    pdf.drawString(25 * mm, y, label)
+    pdf.setFont('Helvetica', 10)
+    pdf.drawString(80 * mm, y, value)
+    return y - 7 * mm
+
+
+def render_receipt(receipt):
+    """Return the PDF bytes for one approved receipt (see receipt_pdf.receipt_data)"""
+    buffer = BytesIO()
+    width, height = A4
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    pdf.setTitle(f"Departmental Dues Receipt {receipt['receipt_number']}")
+
+    # Watermark
+    pdf.saveState()
+    pdf.setFillColor(colors.Color(0, 0, 0, alpha=0.06))
+    pdf.setFont('Helvetica-Bold', 60)
+    pdf.translate(width / 2, height / 2)
+    pdf.rotate(35)
+    pdf.drawCentredString(0, 20, 'BME FUTO OFFICIAL')
+    pdf.setFont('Helvetica-Bold', 24)
+    pdf.drawCentredString(0, -30, receipt['watermark_code'])
+    pdf.restoreState()
+
+    # Header band
+    pdf.setFillColor(PRIMARY)
+    pdf.rect(0, height - 40 * mm, width, 40 * mm, stroke=0, fill=1)
+    pdf.setFillColor(colors.white)
+    pdf.setFont('Helvetica-Bold', 16)
+    pdf.drawCentredString(width / 2, height - 17 * mm, 'BIOMEDICAL ENGINEERING DEPARTMENT')
+    pdf.setFont('Helvetica', 11)
+    pdf.drawCentredString(width / 2, height - 25 * mm, 'Federal University of Technology, Owerri')
+    pdf.setFont('Helvetica', 9)
+    pdf.drawCentredString(width / 2, height - 31 * mm, 'PMB 1526, Owerri, Imo State, Nigeria')
+
+    pdf.setFillColor(colors.black)
+    pdf.setFont('Helvetica-Bold', 14)
+    pdf.drawCentredString(width / 2, height - 55 * mm, 'DEPARTMENTAL DUES RECEIPT')
+    pdf.setFont('Helvetica', 10)
+    pdf.drawString(25 * mm, height - 65 * mm, f"Receipt No: {receipt['receipt_number']}")
+    pdf.drawRightString(width - 25 * mm, height - 65 * mm, f"Date: {receipt['approved_on']}")
+
+    y = height - 82 * mm
+    pdf.setFont('Helvetica-Bold', 12)
+    pdf.drawString(25 * mm, y, 'STUDENT INFORMATION')
+    y -= 9 * mm
+    y = _row(pdf, y, 'Full Name:', receipt['full_name'])
+    y = _row(pdf, y, 'Registration Number:', receipt['reg_number'])
+    y = _row(pdf, y, 'Level:', f"{receipt['level']} Level")
+    y = _row(pdf, y, 'Email:', receipt['email'] or 'N/A')
+    y = _row(pdf, y, 'Phone:', receipt['phone'] or 'N/A')
+
+    y -= 6 * mm
+    pdf.setFont('Helvetica-Bold', 12)
+    pdf.drawString(25 * mm, y, 'PAYMENT DETAILS')
+    y -= 9 * mm
+    y = _row(pdf, y, 'Description:', f"Departmental Dues - {receipt['academic_session']} Academic Session")
+    y = _row(pdf, y, 'Total Amount Paid:', f"NGN {receipt['amount_paid']}")
+    y = _row(pdf, y, 'Payment Reference:', receipt['payment_reference'])
+
+    y -= 6 * mm
+    pdf.setStrokeColor(MUTED)
+    pdf.setDash(4, 3)
+    pdf.rect(20 * mm, y - 30 * mm, width - 40 * mm, 34 * mm, stroke=1, fill=0)
+    pdf.setDash()
+    pdf.setFont('Helvetica-Bold', 11)
+    pdf.drawString(25 * mm, y - 4 * mm, 'VERIFICATION & SECURITY')
+    y = _row(pdf, y - 12 * mm, 'Verification Code:', receipt['watermark_code'])
+    y = _row(pdf, y, 'Approved By:', receipt['approved_by'])
+    pdf.setFont('Helvetica', 8)
+    pdf.setFillColor(MUTED)
+    pdf.drawString(25 * mm, y, f"Verify at {receipt['verify_url']}")
+
+    # Stamp
+    pdf.saveState()
+    pdf.setStrokeColor(SUCCESS)
+    pdf.setFillColor(SUCCESS)
+    pdf.setLineWidth(2)
+    pdf.translate(width - 50 * mm, 45 * mm)
+    pdf.rotate(-15)
+    pdf.circle(0, 0, 18 * mm, stroke=1, fill=0)
+    pdf.setFont('Helvetica-Bold', 14)
+    pdf.drawCentredString(0, -2 * mm, 'APPROVED')
+    pdf.restoreState()
+
+    pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
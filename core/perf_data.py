@@ -0,0 +1,271 @@
+# Synthetic, production-shaped data for benchmarks and load tests. Every
+# value comes from one random.Random(seed), so the same options give the
+# same rows. Students are generated CHUNK_STUDENTS at a time and inserted
+# with bulk_create, and the stored semester/summary totals, counters and
+# search documents are filled in directly instead of through the signals.
+import random
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connections, router, transaction
+from django.utils import timezone
+from .analytics import ANALYTICS_CACHE_KEY
+from .cgpa import academic_session, compute_gpa
+from .content_cache import bump_content_version
+from .counters import recount
+from .models import (Student, Semester, Course, CGPACalculation, CGPASummary, DepartmentalDues,
+                     ReceiptSequence, PastQuestion, LibraryResource, CourseHandbook)
+from .search import refresh_search_vectors
+
+CHUNK_STUDENTS = 1000
+BATCH_SIZE = 5000
+# Generated students get numbers from here up and an address at this domain,
+# which is how flush() finds them again
+REG_NUMBER_START = 900000
+EMAIL_DOMAIN = 'perf.example.com'
+LINK_PREFIX = 'https://example.com/perf/'
+
+LEVELS = ['100', '200', '300', '400', '500']
+# Larger intake in the early years, some attrition later
+LEVEL_WEIGHTS = [24, 21, 19, 18, 18]
+SEMESTERS = ['First', 'Second']
+COURSE_PREFIXES = ['BME', 'BME', 'BME', 'BME', 'MTH', 'PHY', 'CHM', 'EEE', 'MEE', 'GST']
+CREDIT_UNITS = [1, 2, 2, 3, 3, 3, 3, 4]
+COURSE_TOPICS = [
+    'Biomechanics', 'Biomaterials', 'Engineering Mathematics', 'Human Physiology', 'Human Anatomy',
+    'Medical Imaging', 'Biosignal Processing', 'Circuit Theory', 'Thermodynamics', 'Fluid Mechanics',
+    'Biomedical Instrumentation', 'Tissue Engineering', 'Rehabilitation Engineering',
+    'Clinical Engineering', 'Computer Programming', 'Engineering Statistics', 'Engineering Drawing',
+    'Use of English', 'Control Systems', 'Biotransport Phenomena',
+]
+FIRST_NAMES = [
+    'Chinedu', 'Adaeze', 'Emeka', 'Ngozi', 'Ifeanyi', 'Chiamaka', 'Obinna', 'Amarachi', 'Tunde', 'Funmilayo',
+    'Ibrahim', 'Aisha', 'Kelechi', 'Uchenna', 'Chioma', 'Nnamdi', 'Blessing', 'Somtochukwu', 'Ebuka', 'Zainab',
+]
+LAST_NAMES = [
+    'Okafor', 'Eze', 'Nwosu', 'Obi', 'Okeke', 'Nwachukwu', 'Adeyemi', 'Balogun', 'Ibe', 'Onyekachi',
+    'Uzoma', 'Chukwu', 'Okoro', 'Anyanwu', 'Nnadi', 'Mohammed', 'Ogbonna', 'Iwu', 'Ekwueme', 'Agu',
+]
+LIBRARY_CATEGORIES = ['Textbook', 'Textbook', 'Lecture', 'Lecture', 'Journal', 'Project', 'Thesis', 'Other']
+LIBRARY_SUBTITLES = ['Principles', 'Applications', 'A Primer', 'Lecture Notes', 'Case Studies']
+
+
+@contextmanager
+def _keep_timestamps(*fields):
+    """Let bulk_create keep the values set on auto_now_add fields"""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _session(start_year):
+    return f'{start_year}/{start_year + 1}'
+
+
+def _grade(rng, ability):
+    # Whole grade points 0-5 around the student's ability
+    return float(min(5, max(0, round(rng.gauss(ability, 0.9)))))
+
+
+def build_catalog(rng, courses_per_semester):
+    """{(level, semester): [(course_code, course_title, credit_unit), ...]}"""
+    catalog = {}
+    for level in LEVELS:
+        for index, semester in enumerate(SEMESTERS, start=1):
+            catalog[level, semester] = [
+                (f'{rng.choice(COURSE_PREFIXES)} {int(level) + 2 * k + index}',
+                 f'{rng.choice(COURSE_TOPICS)} {["I", "II", "III"][k % 3]}',
+                 rng.choice(CREDIT_UNITS))
+                for k in range(courses_per_semester)
+            ]
+    return catalog
+
+
+def _handbook(catalog):
+    CourseHandbook.objects.bulk_create([
+        CourseHandbook(level=level, semester=semester, course_code=code, course_title=title,
+                       credit_unit=credit_unit, course_type='Core' if code.startswith('BME') else 'Required')
+        for (level, semester), rows in catalog.items()
+        for code, title, credit_unit in rows
+    ], batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+
+def _insert_courses(rows):
+    """
+    Insert (semester_id, course_code, course_name, credit_unit, grade_point)
+    rows with executemany. Courses are most of the generated rows and model
+    instances plus bulk_create's per-value preparation cost several times
+    the insert itself.
+    """
+    fields = [Course._meta.get_field(name) for name in
+              ('semester', 'course_code', 'course_name', 'credit_unit', 'grade_point', 'created_at')]
+    connection = connections[router.db_for_write(Course)]
+    created_at = connection.ops.adapt_datetimefield_value(timezone.now())
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        connection.ops.quote_name(Course._meta.db_table),
+        ', '.join(connection.ops.quote_name(field.column) for field in fields),
+        ', '.join(['%s'] * len(fields)),
+    )
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), BATCH_SIZE):
+            cursor.executemany(sql, [row + (created_at,) for row in rows[start:start + BATCH_SIZE]])
+
+
+def _students(rng, first, count, session_start, catalog, max_semesters, full_history, calculations,
+              dues_rate, approved_rate, approver):
+    """Generate and insert one chunk of students with everything that hangs off them"""
+    students, semesters, plans = [], [], []
+    for i in range(first, first + count):
+        level_index = rng.choices(range(len(LEVELS)), weights=LEVEL_WEIGHTS)[0]
+        if full_history:
+            level_index = min(len(LEVELS) - 1, (max_semesters - 1) // 2)
+        entry_year = session_start - level_index
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        student = Student(
+            reg_number=f'{entry_year}/{REG_NUMBER_START + i}',
+            full_name=f'{first_name} {last_name}',
+            email=f'{first_name}.{last_name}{i}@{EMAIL_DOMAIN}'.lower(),
+            phone=f'080{rng.randrange(10 ** 8):08d}' if rng.random() < 0.6 else None,
+            level=LEVELS[level_index],
+            created_at=timezone.make_aware(datetime(entry_year, 10, 1)) + timedelta(days=rng.randrange(60)),
+        )
+        students.append(student)
+        # Finished semesters of earlier levels plus this session's first or both
+        taken = min(max_semesters, 2 * level_index + rng.randint(1, 2))
+        if full_history:
+            taken = max_semesters
+        ability = min(4.8, max(1.0, rng.gauss(3.1, 0.75)))
+        for n in range(taken):
+            level, semester_name = LEVELS[n // 2], SEMESTERS[n % 2]
+            grades = [(code, title, credit_unit, _grade(rng, ability))
+                      for code, title, credit_unit in catalog[level, semester_name]]
+            semesters.append(Semester(student=student, name=f'{level} Level {semester_name} Semester',
+                                      year=_session(entry_year + n // 2)))
+            plans.append(grades)
+
+    Student.objects.bulk_create(students, batch_size=BATCH_SIZE)
+    for semester, grades in zip(semesters, plans):
+        semester.courses_count = len(grades)
+        semester.total_credits = sum(credit_unit for _, _, credit_unit, _ in grades)
+        semester.total_points = sum(credit_unit * point for _, _, credit_unit, point in grades)
+        semester.gpa = compute_gpa(semester.total_points, semester.total_credits)
+    Semester.objects.bulk_create(semesters, batch_size=BATCH_SIZE)
+    _insert_courses([
+        (semester.pk, code, title, credit_unit, point)
+        for semester, grades in zip(semesters, plans)
+        for code, title, credit_unit, point in grades
+    ])
+
+    # Running totals after each semester, for the summary and the calculation history
+    history = {}
+    for semester in semesters:
+        credits, points = history.setdefault(semester.student_id, [(0, 0.0)])[-1]
+        history[semester.student_id].append((credits + semester.total_credits, points + semester.total_points))
+    CGPASummary.objects.bulk_create([
+        CGPASummary(student_id=reg_number, total_credits=totals[-1][0], total_points=totals[-1][1],
+                    cgpa=compute_gpa(totals[-1][1], totals[-1][0]))
+        for reg_number, totals in history.items()
+    ], batch_size=BATCH_SIZE)
+    now = timezone.now()
+    CGPACalculation.objects.bulk_create([
+        CGPACalculation(student_id=reg_number, total_credit_units=credits, total_grade_points=points,
+                        cgpa=compute_gpa(points, credits),
+                        calculated_at=now - timedelta(days=120 * back + rng.randrange(30)))
+        for reg_number, totals in history.items()
+        for back, (credits, points) in enumerate(reversed(totals[-calculations:] if calculations else []))
+        if credits
+    ], batch_size=BATCH_SIZE)
+
+    paying = [student for student in students if rng.random() < dues_rate]
+    dues = []
+    for student, receipt_number in zip(paying, ReceiptSequence.allocate(len(paying)) if paying else []):
+        approved = rng.random() < approved_rate
+        paid_at = timezone.make_aware(datetime(session_start, 10, 1)) + timedelta(days=rng.randrange(150))
+        dues.append(DepartmentalDues(
+            student=student,
+            amount_paid=rng.choice([5000, 5000, 5000, 5500, 6000]),
+            academic_session=_session(session_start),
+            payment_reference=f'PAY-{rng.getrandbits(40):010X}',
+            watermark_code=f'BME-{rng.getrandbits(48):012X}',
+            receipt_number=receipt_number,
+            is_approved=approved,
+            approved_by=approver if approved else None,
+            approved_at=paid_at + timedelta(days=rng.randrange(1, 8)) if approved else None,
+            created_at=paid_at,
+        ))
+    DepartmentalDues.objects.bulk_create(dues, batch_size=BATCH_SIZE)
+    return len(semesters), sum(len(grades) for grades in plans), len(dues)
+
+
+def _library(rng, catalog, past_questions, resources, session_start):
+    codes = [(level, semester, code, title) for (level, semester), rows in catalog.items()
+             for code, title, _ in rows]
+    PastQuestion.objects.bulk_create([
+        PastQuestion(course_code=code, course_title=title, level=level, semester=semester,
+                     year=session_start - rng.randrange(10), link=f'{LINK_PREFIX}past-questions/{i}',
+                     description=f'{code} examination questions')
+        for i, (level, semester, code, title) in enumerate(rng.choice(codes) for _ in range(past_questions))
+    ], batch_size=BATCH_SIZE)
+    LibraryResource.objects.bulk_create([
+        LibraryResource(title=f'{rng.choice(COURSE_TOPICS)}: {rng.choice(LIBRARY_SUBTITLES)}',
+                        author=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                        category=rng.choice(LIBRARY_CATEGORIES),
+                        description='Reference material for biomedical engineering students.',
+                        link=f'{LINK_PREFIX}library/{i}', level=rng.choice(LEVELS + [None]))
+        for i in range(resources)
+    ], batch_size=BATCH_SIZE)
+
+
+def flush():
+    """Delete everything an earlier seed_perf_data() generated"""
+    Student.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').delete()
+    PastQuestion.objects.filter(link__startswith=LINK_PREFIX).delete()
+    LibraryResource.objects.filter(link__startswith=LINK_PREFIX).delete()
+
+
+def seed_perf_data(students=10000, semesters=10, courses=8, full_history=False, calculations=3, dues_rate=0.8,
+                   approved_rate=0.75, past_questions=1000, resources=300, seed=0, session_start=None,
+                   progress=None):
+    """
+    Generate students (each with as many semesters as their level allows,
+    up to semesters, of courses courses, plus their CGPA summary,
+    calculations and dues), a course handbook, past questions and library
+    resources. full_history gives every student all semesters as a final
+    year student. Returns a dict of row counts.
+    """
+    rng = random.Random(seed)
+    session_start = session_start or int(academic_session(timezone.now()).split('/')[0])
+    catalog = build_catalog(rng, courses)
+    approver = User.objects.filter(is_superuser=True).order_by('pk').first()
+    totals = {'students': students, 'semesters': 0, 'courses': 0, 'dues': 0,
+              'past_questions': past_questions, 'library_resources': resources}
+
+    timestamps = [Student._meta.get_field('created_at'), DepartmentalDues._meta.get_field('created_at'),
+                  CGPACalculation._meta.get_field('calculated_at')]
+    with _keep_timestamps(*timestamps):
+        _handbook(catalog)
+        for first in range(0, students, CHUNK_STUDENTS):
+            count = min(CHUNK_STUDENTS, students - first)
+            with transaction.atomic():
+                chunk = _students(rng, first, count, session_start, catalog, semesters, full_history,
+                                  calculations, dues_rate, approved_rate, approver)
+            for key, value in zip(('semesters', 'courses', 'dues'), chunk):
+                totals[key] += value
+            if progress:
+                progress(first + count, students)
+        _library(rng, catalog, past_questions, resources, session_start)
+
+    # bulk_create skips the signals that keep these up to date
+    for model in (Student, DepartmentalDues, PastQuestion, LibraryResource):
+        recount(model)
+    for model in (PastQuestion, LibraryResource, CourseHandbook):
+        refresh_search_vectors(model.objects.all())
+    for scope in ('homepage', 'search', 'handbook'):
+        bump_content_version(scope)
+    cache.delete(ANALYTICS_CACHE_KEY)
+    return totals
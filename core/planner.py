@@ -0,0 +1,142 @@
+# What-if CGPA planning over the courses a student still has to take.
+# Grade points and credit units are whole numbers, so the grade points the
+# remaining courses can add up to are a short list of integers; their exact
+# probabilities come from folding in one course at a time, which is
+# (courses x reachable totals x grades) additions in plain Python.
+from django.db.models import Count
+from .cgpa import get_summary
+from .models import Course, CourseHandbook
+
+GRADE_POINTS = [5.0, 4.0, 3.0, 2.0, 1.0, 0.0]
+GRADE_LETTERS = ['A', 'B', 'C', 'D', 'E', 'F']
+
+# Lower bound of each class of degree, ascending, as shown on the CGPA result page
+DEGREE_CLASSES = [
+    (0.0, 'Pass'),
+    (1.5, 'Third Class'),
+    (2.5, 'Second Class Lower'),
+    (3.5, 'Second Class Upper'),
+    (4.5, 'First Class'),
+]
+
+
+def remaining_courses(student):
+    """Handbook courses from the student's level upwards not yet recorded"""
+    taken = Course.objects.filter(semester__student=student).values('course_code')
+    levels = [value for value, _ in CourseHandbook.LEVEL_CHOICES if int(value) >= int(student.level)]
+    return list(CourseHandbook.objects
+                .filter(level__in=levels)
+                .exclude(course_code__in=taken)
+                .values('course_code', 'course_title', 'credit_unit', 'level', 'semester'))
+
+
+def grade_probabilities(student):
+    """The student's own grade frequencies, add-one smoothed so no grade is impossible"""
+    counts = dict(Course.objects.filter(semester__student=student)
+                  .values_list('grade_point').annotate(n=Count('id')))
+    frequency = [counts.get(point, 0) + 1.0 for point in GRADE_POINTS]
+    total = sum(frequency)
+    return [count / total for count in frequency]
+
+
+def points_distribution(credits, probabilities):
+    """
+    Probability of each total of grade points over courses with these credit
+    units, each graded independently with probabilities. Index = points.
+    """
+    distribution = [1.0]
+    for credit in credits:
+        folded = [0.0] * (len(distribution) + int(GRADE_POINTS[0]) * credit)
+        for points, chance in enumerate(distribution):
+            if chance:
+                for grade_point, grade_chance in zip(GRADE_POINTS, probabilities):
+                    folded[points + int(grade_point) * credit] += chance * grade_chance
+        distribution = folded
+    return distribution
+
+
+def minimum_plan(credits, required_points):
+    """
+    Cheapest grades that reach required_points: every course at one grade,
+    with just enough of the heaviest courses raised one grade above it.
+    Returns a grade index per course, in credits order, or None if unreachable.
+    """
+    total = sum(credits)
+    lowest = len(GRADE_POINTS) - 1
+    if required_points <= 0:
+        return [lowest] * len(credits)
+    if required_points > GRADE_POINTS[0] * total:
+        return None
+    # Highest uniform grade that falls short, then top up with the heaviest courses
+    short = sum(1 for point in GRADE_POINTS if point * total < required_points)
+    base = lowest - (short - 1)
+    needed = required_points - GRADE_POINTS[base] * total - 1e-9
+    step = GRADE_POINTS[base - 1] - GRADE_POINTS[base]
+    plan = [base] * len(credits)
+    raised = 0.0
+    for i in sorted(range(len(credits)), key=lambda i: -credits[i]):
+        if raised >= needed:
+            break
+        plan[i] = base - 1
+        raised += credits[i] * step
+    return plan
+
+
+def plan_cgpa(student, target):
+    """What it takes to finish on target, and how likely it is on current form"""
+    summary = get_summary(student)
+    courses = remaining_courses(student)
+    credits = [course['credit_unit'] for course in courses]
+    remaining_credits = sum(credits)
+    final_credits = summary.total_credits + remaining_credits
+    required_points = target * final_credits - summary.total_points
+
+    result = {
+        'target': target,
+        'current_cgpa': summary.cgpa,
+        'completed_credits': summary.total_credits,
+        'remaining_credits': remaining_credits,
+        'remaining_courses': courses,
+        'required_average': None,
+        'plan': None,
+        'probability': None,
+        'distribution': [],
+        'percentiles': {},
+    }
+    if not courses or final_credits == 0:
+        return result
+
+    result['required_average'] = round(max(required_points, 0.0) / remaining_credits, 2)
+    plan = minimum_plan(credits, required_points)
+    if plan is not None:
+        result['plan'] = [
+            {**course, 'grade': GRADE_LETTERS[index], 'grade_point': GRADE_POINTS[index]}
+            for course, index in zip(courses, plan)
+        ]
+
+    # (final CGPA, probability) for every reachable total, lowest first
+    outcomes = [
+        ((summary.total_points + points) / final_credits, chance)
+        for points, chance in enumerate(points_distribution(credits, grade_probabilities(student)))
+        if chance
+    ]
+    result['probability'] = round(sum(chance for cgpa, chance in outcomes if cgpa >= target - 1e-9), 4)
+    shares = [0.0] * len(DEGREE_CLASSES)
+    for cgpa, chance in outcomes:
+        shares[max(i for i, (bound, _) in enumerate(DEGREE_CLASSES) if cgpa >= bound)] += chance
+    result['distribution'] = [
+        {'label': label, 'probability': round(share, 4)}
+        for (_, label), share in reversed(list(zip(DEGREE_CLASSES, shares)))
+    ]
+    result['percentiles'] = {f'p{q}': round(_quantile(outcomes, q / 100), 2) for q in (10, 50, 90)}
+    return result
+
+
+def _quantile(outcomes, fraction):
+    """Lowest outcome with at least fraction of the probability at or below it"""
+    cumulative = 0.0
+    for cgpa, chance in outcomes:
+        cumulative += chance
+        if cumulative >= fraction - 1e-12:
+            return cgpa
+    return outcomes[-1][0]
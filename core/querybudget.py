@@ -0,0 +1,69 @@
+# Per-request query budgets for development and tests. Views declare how
+# many queries they may run with @query_budget(n); QueryBudgetMiddleware
+# counts every query a request runs and logs (or, with QUERY_BUDGET_RAISE,
+# raises) when the view goes over. Views without a declared budget get
+# QUERY_BUDGET_DEFAULT.
+import logging
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUERY_BUDGET = 25
+QUERY_COUNT_HEADER = 'X-Query-Count'
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(limit):
+    """Declare the most database queries one request to the view may run"""
+    def decorator(view_func):
+        # Set on the function itself so functools.wraps carries it through
+        # login_required/student_required stacked above
+        view_func.query_budget = limit
+        return view_func
+    return decorator
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class QueryBudgetMiddleware:
+    """
+    Count the queries of each request and compare them with the view's
+    budget. Queries a streaming response runs while it is being sent are
+    not counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = _QueryCounter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+
+        response[QUERY_COUNT_HEADER] = str(counter.count)
+        budget = getattr(request, '_query_budget', None)
+        if budget is not None and counter.count > budget:
+            message = f"{request.method} {request.path} ran {counter.count} queries, budget is {budget}"
+            if getattr(settings, 'QUERY_BUDGET_RAISE', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget = getattr(
+            view_func, 'query_budget', getattr(settings, 'QUERY_BUDGET_DEFAULT', DEFAULT_QUERY_BUDGET)
+        )
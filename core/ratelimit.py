@@ -0,0 +1,48 @@
+import time
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+
+
+def client_ip(request):
+    """
+    The client's address as seen by the nearest trusted proxy. Behind
+    RATELIMIT_TRUSTED_PROXIES proxies, REMOTE_ADDR is the last proxy and
+    the client is that many entries from the end of X-Forwarded-For;
+    entries further left were sent by the client and can be forged.
+    """
+    proxies = getattr(settings, 'RATELIMIT_TRUSTED_PROXIES', 0)
+    forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+    if proxies and forwarded:
+        return forwarded[-min(proxies, len(forwarded))]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def hit(scope, ident, limit, window):
+    """Count one request in the current fixed window; True if over the limit"""
+    key = f'ratelimit:{scope}:{ident}:{int(time.time() // window)}'
+    cache.add(key, 0, window)
+    try:
+        count = cache.incr(key)
+    except ValueError:
+        # The window's key expired between add() and incr()
+        cache.set(key, 1, window)
+        count = 1
+    return count > limit
+
+
+def rate_limit(scope, limit, window=60):
+    """Allow each client IP at most limit requests per window seconds"""
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if hit(scope, client_ip(request), limit, window):
+                headers = {'Retry-After': str(window)}
+                if request.GET.get('format') == 'json':
+                    return JsonResponse({'error': 'Too many requests'}, status=429, headers=headers)
+                return HttpResponse('Too many requests. Please wait a minute and try again.',
+                                    status=429, headers=headers)
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,58 @@
+# PDF receipts. An approved DepartmentalDues row is drawn once and the bytes
+# kept in the shared cache, keyed by the receipt number and the last change
+# to the dues and student rows, so an edit to either renders a fresh PDF on
+# the next download and the stale one simply expires. Nothing is written to
+# disk, since the serverless filesystem is read-only. prerender_receipts
+# fills the cache for a whole session ahead of a download rush.
+import hashlib
+from django.core.cache import cache
+from django.urls import reverse
+from .pdf import render_receipt
+
+RECEIPT_PDF_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+
+
+def receipt_filename(dues):
+    return f"receipt-{dues.receipt_number.replace('/', '-')}.pdf"
+
+
+def receipt_data(dues, base_url=''):
+    """Everything the PDF shows, as plain values"""
+    student = dues.student
+    approved_by = dues.approved_by
+    return {
+        'receipt_number': dues.receipt_number,
+        'watermark_code': dues.watermark_code,
+        'payment_reference': dues.payment_reference,
+        'academic_session': dues.academic_session,
+        'amount_paid': f"{dues.amount_paid:,.2f}",
+        'approved_on': dues.approved_at.strftime('%B %d, %Y') if dues.approved_at else '',
+        'approved_by': (approved_by.get_full_name() or approved_by.username) if approved_by else '',
+        'full_name': student.full_name,
+        'reg_number': student.reg_number,
+        'level': student.level,
+        'email': student.email or '',
+        'phone': student.phone or '',
+        'verify_url': f"{base_url}{reverse('verify_receipt')}?code={dues.watermark_code}",
+    }
+
+
+def receipt_cache_key(dues, base_url=''):
+    # The site address goes into the verification link, so it is part of the key
+    version = f'{dues.receipt_number}|{dues.updated_at.isoformat()}|{dues.student.updated_at.isoformat()}|{base_url}'
+    return f'receipt:pdf:{hashlib.sha1(version.encode()).hexdigest()}'
+
+
+def render_receipt_pdf(dues, base_url=''):
+    """Render the receipt for an approved dues row and cache the bytes"""
+    content = render_receipt(receipt_data(dues, base_url))
+    cache.set(receipt_cache_key(dues, base_url), content, RECEIPT_PDF_CACHE_TIMEOUT)
+    return content
+
+
+def receipt_pdf(dues, base_url=''):
+    """PDF bytes of the receipt for an approved dues row, from the cache when current"""
+    content = cache.get(receipt_cache_key(dues, base_url))
+    if content is None:
+        content = render_receipt_pdf(dues, base_url)
+    return content
@@ -0,0 +1,56 @@
+from django.core.cache import cache
+from .models import DepartmentalDues
+
+VERIFY_CACHE_TIMEOUT = 60
+
+
+def normalize_code(code):
+    return (code or '').strip().upper()
+
+
+def verification_cache_key(code):
+    return f'receipt:verify:{normalize_code(code)}'
+
+
+def _lookup(code):
+    # Receipt numbers look like BME/2024/0001, watermark codes like BME-1A2B3C4D5E6F;
+    # each has its own unique index
+    field = 'receipt_number' if '/' in code else 'watermark_code'
+    row = (DepartmentalDues.objects.filter(**{field: code})
+           .values('is_approved', 'academic_session')
+           .first())
+    if row is None:
+        return {'valid': False, 'code': code}
+    return {
+        'valid': True,
+        'code': code,
+        'approved': row['is_approved'],
+        'academic_session': row['academic_session'],
+    }
+
+
+def verify_receipt(code):
+    """
+    Verification result for a watermark code or receipt number. The page is
+    public, so it says only whether the receipt exists, whether it is
+    approved and for which session, never whose it is. Results, including
+    misses, are cached briefly so repeated scans skip the DB.
+    """
+    code = normalize_code(code)
+    if not code:
+        return None
+    key = verification_cache_key(code)
+    result = cache.get(key)
+    if result is None:
+        result = _lookup(code)
+        cache.set(key, result, VERIFY_CACHE_TIMEOUT)
+    return result
+
+
+def invalidate_receipts(codes):
+    """Drop the cached results for watermark codes and receipt numbers"""
+    cache.delete_many([verification_cache_key(code) for code in codes if code])
+
+
+def invalidate_receipt(dues):
+    invalidate_receipts([dues.watermark_code, dues.receipt_number])
@@ -0,0 +1,109 @@
+# Bulk student roster import from CSV or XLSX. Rows stream from read_rows()
+# and are handled ROSTER_BATCH_SIZE at a time: each batch is validated,
+# checked against existing registration numbers with one in_bulk and
+# inserted with one bulk_create, so memory stays flat however long the
+# roster is. Every row that is not imported ends up in the report.
+import re
+from itertools import islice
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from .counters import recount
+from .models import Student
+
+ROSTER_BATCH_SIZE = 1000
+ROSTER_COLUMNS = {'reg_number', 'full_name'}
+# Year of entry and one or two number groups, e.g. 2020/123456 or 2020/1/12345
+REG_NUMBER_PATTERN = re.compile(r'^(19|20)\d{2}(/\d{1,10}){1,2}$')
+LEVELS = {value for value, _ in Student.LEVEL_CHOICES}
+
+
+def _batches(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def _problem(line, row, reason):
+    return {'line': line, 'reg_number': row.get('reg_number', ''), 'reason': reason}
+
+
+def _level(value, default):
+    # Accept "300", "300L" and "300 Level"
+    if not value:
+        return default
+    match = re.match(r'^(\d00)\s*(l|level)?$', value.lower())
+    if not match or match.group(1) not in LEVELS:
+        raise ValueError(f'Unknown level "{value}"')
+    return match.group(1)
+
+
+def _student(row, level):
+    """Unsaved Student for one row; raises ValueError with the reason it is invalid"""
+    reg_number = row.get('reg_number', '')
+    full_name = ' '.join(row.get('full_name', '').split())
+    email = row.get('email', '')
+    phone = row.get('phone', '')
+    if not REG_NUMBER_PATTERN.match(reg_number):
+        raise ValueError('Registration number is not in the YYYY/NNNNNN format')
+    if not full_name:
+        raise ValueError('No full name')
+    if len(full_name) > Student._meta.get_field('full_name').max_length:
+        raise ValueError('Full name is too long')
+    if email:
+        try:
+            validate_email(email)
+        except ValidationError:
+            raise ValueError(f'Invalid email "{email}"')
+    if len(phone) > Student._meta.get_field('phone').max_length:
+        raise ValueError('Phone number is too long')
+    return Student(reg_number=reg_number, full_name=full_name, email=email or None,
+                   phone=phone or None, level=_level(row.get('level', ''), level))
+
+
+def import_roster(rows, level='100', batch_size=ROSTER_BATCH_SIZE):
+    """
+    Create Students for rows from read_rows(). A blank level cell falls
+    back to level. Returns a report dict: the number of students created
+    plus the existing, duplicate and invalid rows.
+    """
+    report = {'created': 0, 'existing': [], 'duplicates': [], 'invalid': []}
+    seen = {}
+    for batch in _batches(rows, batch_size):
+        candidates = {}
+        for line, row in batch:
+            try:
+                student = _student(row, level)
+            except ValueError as error:
+                report['invalid'].append(_problem(line, row, str(error)))
+                continue
+            if student.pk in seen:
+                report['duplicates'].append(_problem(line, row, f'Same student as line {seen[student.pk]}'))
+                continue
+            seen[student.pk] = line
+            candidates[student.pk] = (line, row, student)
+
+        existing = Student.objects.only('pk').in_bulk(list(candidates))
+        new_students = {}
+        for reg_number, (line, row, student) in candidates.items():
+            if reg_number in existing:
+                report['existing'].append(_problem(line, row, 'Student is already registered'))
+            else:
+                new_students[reg_number] = student
+        if not new_students:
+            continue
+        # ignore_conflicts skips students who self-register between the lookup
+        # and the insert. A row is one of ours if it has the created_at
+        # bulk_create gave our object; the rest are reported as existing.
+        Student.objects.bulk_create(list(new_students.values()), ignore_conflicts=True)
+        inserted = set(Student.objects.filter(pk__in=list(new_students)).values_list('pk', 'created_at'))
+        for reg_number, student in new_students.items():
+            if (reg_number, student.created_at) in inserted:
+                report['created'] += 1
+            else:
+                line, row, _ = candidates[reg_number]
+                report['existing'].append(_problem(line, row, 'Student is already registered'))
+
+    if report['created']:
+        # bulk_create skips the signals, so the student counter is recounted here
+        recount(Student)
+    return report
@@ -0,0 +1,223 @@
+# Site search over past questions, library resources and the course handbook.
+# PostgreSQL ranks a GIN-indexed search_vector column; other databases (SQLite
+# for local runs) use an in-process inverted index rebuilt on content changes.
+import re
+from collections import defaultdict
+from functools import reduce
+from operator import add, and_
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections, router
+from django.db.models import F
+from django.urls import reverse
+from .content_cache import content_version
+from .models import PastQuestion, LibraryResource, CourseHandbook
+
+SEARCH_CONFIG = 'english'
+MAX_RESULTS_PER_SOURCE = 100
+
+# SearchRank's default weights for the A-D labels
+WEIGHT_VALUES = {'A': 1.0, 'B': 0.4, 'C': 0.2, 'D': 0.1}
+
+
+def _question_result(row):
+    return {
+        'title': f"{row['course_code']} - {row['course_title']}",
+        'subtitle': f"{row['level']} Level · {row['semester']} Semester · {row['year']}",
+        'link': row['link'],
+    }
+
+
+def _library_result(row):
+    return {
+        'title': row['title'],
+        'subtitle': ' · '.join(filter(None, [row['author'], row['category']])),
+        'link': row['link'],
+    }
+
+
+def _handbook_result(row):
+    return {
+        'title': f"{row['course_code']} - {row['course_title']}",
+        'subtitle': f"{row['level']} Level · {row['semester']} Semester · {row['credit_unit']} units",
+        'link': f"{reverse('view_course_handbook')}?level={row['level']}&semester={row['semester']}",
+    }
+
+
+SEARCH_SOURCES = {
+    'question': {
+        'model': PastQuestion,
+        'label': 'Past Question',
+        'weights': {'course_code': 'A', 'course_title': 'A', 'description': 'C'},
+        'fields': ['course_code', 'course_title', 'level', 'semester', 'year', 'link'],
+        'result': _question_result,
+    },
+    'library': {
+        'model': LibraryResource,
+        'label': 'Library',
+        'weights': {'title': 'A', 'author': 'B', 'description': 'C'},
+        'fields': ['title', 'author', 'category', 'link'],
+        'result': _library_result,
+    },
+    'handbook': {
+        'model': CourseHandbook,
+        'label': 'Course Handbook',
+        'weights': {'course_code': 'A', 'course_title': 'A', 'description': 'C'},
+        'fields': ['course_code', 'course_title', 'level', 'semester', 'credit_unit'],
+        'result': _handbook_result,
+    },
+}
+
+SEARCH_MODELS = tuple(source['model'] for source in SEARCH_SOURCES.values())
+
+
+def uses_postgres(model):
+    return connections[router.db_for_read(model)].vendor == 'postgresql'
+
+
+def _source_for(model):
+    return next(source for source in SEARCH_SOURCES.values() if source['model'] is model)
+
+
+def search_vector(weights):
+    return reduce(add, [
+        SearchVector(field, weight=weight, config=SEARCH_CONFIG) for field, weight in weights.items()
+    ])
+
+
+def refresh_search_vectors(queryset):
+    """Refresh the stored search documents of every row in queryset (PostgreSQL only)"""
+    model = queryset.model
+    if uses_postgres(model):
+        queryset.update(search_vector=search_vector(_source_for(model)['weights']))
+
+
+def update_search_vector(instance):
+    """Refresh the stored search document for one row (PostgreSQL only)"""
+    refresh_search_vectors(type(instance).objects.filter(pk=instance.pk))
+
+
+def _build_result(kind, row, rank):
+    source = SEARCH_SOURCES[kind]
+    return {'kind': kind, 'label': source['label'], 'rank': rank, **source['result'](row)}
+
+
+# POSTGRESQL FULL-TEXT SEARCH
+# The parser keeps "BME307" as one lexeme but splits "BME 307" in two, so a
+# course code in the query matches either spelling
+COURSE_CODE_RE = re.compile(r'\b([A-Za-z]{2,5})\s*([0-9]{3})\b')
+
+
+def _postgres_query(text):
+    """SearchQuery for text, or None when it has nothing to search for"""
+    parts = [
+        SearchQuery(f'{letters} {digits}', config=SEARCH_CONFIG)
+        | SearchQuery(f'{letters}{digits}', config=SEARCH_CONFIG)
+        for letters, digits in COURSE_CODE_RE.findall(text)
+    ]
+    rest = COURSE_CODE_RE.sub(' ', text)
+    if re.search(r'\w', rest):
+        parts.append(SearchQuery(rest, search_type='websearch', config=SEARCH_CONFIG))
+    return reduce(and_, parts) if parts else None
+
+
+def _postgres_search(kind, text):
+    source = SEARCH_SOURCES[kind]
+    query = _postgres_query(text)
+    if query is None:
+        return []
+    rows = (source['model'].objects
+            .filter(search_vector=query)
+            .annotate(rank=SearchRank(F('search_vector'), query))
+            .order_by('-rank')
+            .values('rank', *source['fields'])[:MAX_RESULTS_PER_SOURCE])
+    return [_build_result(kind, row, row['rank']) for row in rows]
+
+
+# IN-PROCESS INVERTED INDEX
+STOP_WORDS = frozenset(['a', 'an', 'and', 'for', 'in', 'of', 'on', 'the', 'to', 'with'])
+# Letter and digit runs are separate tokens, so "BME307" and "BME 307" both
+# give bme, 307 and the joined bme307
+TOKEN_RE = re.compile(r'[a-z]+|[0-9]+')
+
+
+def _normalize(token):
+    # Cheap plural folding so "biomaterials" finds "biomaterial"
+    if len(token) > 4 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    tokens = [_normalize(t) for t in TOKEN_RE.findall((text or '').lower()) if t not in STOP_WORDS]
+    # Course-code style pairs joined up as well, so a code only matches where
+    # its letters and number are adjacent, not anywhere in the text
+    joined = [a + b for a, b in zip(tokens, tokens[1:]) if a.isalpha() and b.isdigit()]
+    return tokens + joined
+
+
+class InvertedIndex:
+    def __init__(self):
+        self.postings = defaultdict(dict)  # token -> {doc key: weight}
+        self.documents = {}                # doc key -> (kind, row)
+
+    def add(self, kind, row, weights):
+        key = (kind, row['pk'])
+        self.documents[key] = (kind, row)
+        postings = self.postings
+        for field, label in weights.items():
+            weight = WEIGHT_VALUES[label]
+            for token in tokenize(row[field]):
+                postings[token][key] = postings[token].get(key, 0.0) + weight
+
+    def search(self, text, kinds):
+        tokens = list(dict.fromkeys(tokenize(text)))
+        if not tokens:
+            return []
+        # Every query term must match; rarest term first keeps the intersection small
+        matches = sorted((self.postings.get(token, {}) for token in tokens), key=len)
+        candidates = set(matches[0])
+        for posting in matches[1:]:
+            candidates &= posting.keys()
+        results = []
+        for key in candidates:
+            kind, row = self.documents[key]
+            if kind in kinds:
+                rank = sum(posting[key] for posting in matches)
+                results.append(_build_result(kind, row, rank))
+        return results
+
+
+_local_index = {'version': None, 'index': None}
+
+
+def build_index():
+    index = InvertedIndex()
+    for kind, source in SEARCH_SOURCES.items():
+        fields = set(source['fields']) | set(source['weights'])
+        for row in source['model'].objects.values('pk', *fields).iterator():
+            index.add(kind, row, source['weights'])
+    return index
+
+
+def get_index():
+    """The per-process index, rebuilt after any searchable row changes"""
+    version = content_version('search')
+    if _local_index['version'] != version:
+        _local_index['index'] = build_index()
+        _local_index['version'] = version
+    return _local_index['index']
+
+
+def search(text, kinds=None):
+    """Ranked results across the requested kinds (all kinds by default)"""
+    kinds = [kind for kind in (kinds or SEARCH_SOURCES) if kind in SEARCH_SOURCES]
+    text = (text or '').strip()
+    if not text or not kinds:
+        return []
+
+    if uses_postgres(PastQuestion):
+        results = [result for kind in kinds for result in _postgres_search(kind, text)]
+    else:
+        results = get_index().search(text, kinds)
+    results.sort(key=lambda result: (-result['rank'], result['title']))
+    return results
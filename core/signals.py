@@ -0,0 +1,73 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import Student, CourseHandbook, DepartmentalDues
+from .middleware import invalidate_student
+from .content_cache import HOMEPAGE_MODELS, bump_content_version
+from .counters import COUNTED_MODELS, counted_state, model_changed, state_before_save
+from .search import SEARCH_MODELS, update_search_vector
+from .receipts import invalidate_receipt
+
+
+# STUDENT CACHE INVALIDATION
+@receiver([post_save, post_delete], sender=Student)
+def student_changed(sender, instance, **kwargs):
+    invalidate_student(instance.pk)
+
+
+# HOMEPAGE CACHE INVALIDATION
+def homepage_content_changed(sender, **kwargs):
+    bump_content_version()
+
+
+for model in HOMEPAGE_MODELS:
+    post_save.connect(homepage_content_changed, sender=model, dispatch_uid=f'homepage_{model.__name__}_saved')
+    post_delete.connect(homepage_content_changed, sender=model, dispatch_uid=f'homepage_{model.__name__}_deleted')
+
+
+# SITE COUNTERS
+def counted_row_saving(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance._counted_before = state_before_save(sender, instance)
+
+
+def counted_row_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        model_changed(sender, instance.__dict__.pop('_counted_before', None), counted_state(sender, instance))
+
+
+def counted_row_deleted(sender, instance, **kwargs):
+    model_changed(sender, counted_state(sender, instance), None)
+
+
+for model in COUNTED_MODELS:
+    pre_save.connect(counted_row_saving, sender=model, dispatch_uid=f'counters_{model.__name__}_saving')
+    post_save.connect(counted_row_saved, sender=model, dispatch_uid=f'counters_{model.__name__}_saved')
+    post_delete.connect(counted_row_deleted, sender=model, dispatch_uid=f'counters_{model.__name__}_deleted')
+
+
+# SEARCH INDEX
+def searchable_row_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        update_search_vector(instance)
+    bump_content_version('search')
+
+
+def searchable_row_deleted(sender, **kwargs):
+    bump_content_version('search')
+
+
+for model in SEARCH_MODELS:
+    post_save.connect(searchable_row_saved, sender=model, dispatch_uid=f'search_{model.__name__}_saved')
+    post_delete.connect(searchable_row_deleted, sender=model, dispatch_uid=f'search_{model.__name__}_deleted')
+
+
+# COURSE AUTOCOMPLETE
+@receiver([post_save, post_delete], sender=CourseHandbook)
+def handbook_changed(sender, **kwargs):
+    bump_content_version('handbook')
+
+
+# RECEIPT VERIFICATION CACHE
+@receiver([post_save, post_delete], sender=DepartmentalDues)
+def dues_changed(sender, instance, **kwargs):
+    invalidate_receipt(instance)
@@ -1,3 +1,945 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import threading
+import time
+from decimal import Decimal
+from unittest import mock
+from django.conf import settings
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import OperationalError, connection, transaction
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from . import autocomplete, cgpa
+from .analytics import get_snapshot, student_rank
+from .cgpa import add_courses, course_changed, course_contribution, course_removed, rebuild_totals, sync_courses
+from .content_cache import homepage_context
+from .counters import get_counters, reconcile_counters
+from .dues_approval import approve_pending, pending_dues
+from .dues_import import ImportFileError, import_dues, read_rows
+from .pdf import render_receipt
+from .planner import minimum_plan, plan_cgpa, points_distribution
+from .middleware import STUDENT_SESSION_KEY, load_student
+from .pagination import _ordering, decode_cursor, encode_cursor, paginate_keyset
+from .models import (Staff, Exco, PastQuestion, LibraryResource, Testimonial, Announcement, Student,
+                     Semester, Course, CGPACalculation, DepartmentalDues, CourseHandbook, Timetable,
+                     AcademicCalendar, ReceiptSequence)
+from .querybudget import QUERY_COUNT_HEADER, QueryBudgetExceeded
+from .ratelimit import client_ip
+from .receipts import verify_receipt
+from .roster_import import ROSTER_COLUMNS, import_roster
+from .search import _postgres_query, search
+from .urls import urlpatterns
 
-# Create your tests here.
+QUERY_BUDGET_MIDDLEWARE = 'core.querybudget.QueryBudgetMiddleware'
+TIMING_MIDDLEWARE = 'core.timing.RequestTimingMiddleware'
+# Without the timing middleware, which runs no queries and would log every request
+MIDDLEWARE = [QUERY_BUDGET_MIDDLEWARE] + [name for name in settings.MIDDLEWARE
+                                          if name not in (QUERY_BUDGET_MIDDLEWARE, TIMING_MIDDLEWARE)]
+
+# url name -> (who is logged in, seeded object whose pk fills the url's arguments)
+URL_CASES = {
+    'index': ('public', None),
+    'virtual_tour': ('public', None),
+    'staff_list': ('public', None),
+    'exco_list': ('public', None),
+    'past_questions': ('public', None),
+    'library': ('public', None),
+    'search': ('public', None),
+    'submit_testimonial': ('public', None),
+    'student_register': ('public', None),
+    'student_login': ('public', None),
+    'student_logout': ('student', None),
+    'student_dashboard': ('student', None),
+    'student_profile': ('student', None),
+    'delete_student_account': ('student', None),
+    'cgpa_calculator': ('student', None),
+    'add_semester': ('student', None),
+    'edit_semester': ('student', 'semester'),
+    'delete_semester': ('student', 'semester'),
+    'add_course': ('student', 'semester'),
+    'fill_semester_from_handbook': ('student', 'semester'),
+    'course_batch': ('student', 'semester'),
+    'edit_course': ('student', 'course'),
+    'delete_course': ('student', 'course'),
+    'calculate_cgpa': ('student', None),
+    'cgpa_history': ('student', None),
+    'cgpa_planner': ('student', None),
+    'admin_login': ('public', None),
+    'admin_logout': ('admin', None),
+    'admin_dashboard': ('admin', None),
+    'cohort_analytics': ('admin', None),
+    'manage_staff': ('admin', None),
+    'add_staff': ('admin', None),
+    'edit_staff': ('admin', 'staff'),
+    'delete_staff': ('admin', 'staff'),
+    'manage_excos': ('admin', None),
+    'add_exco': ('admin', None),
+    'edit_exco': ('admin', 'exco'),
+    'delete_exco': ('admin', 'exco'),
+    'manage_pastquestions': ('admin', None),
+    'add_pastquestion': ('admin', None),
+    'edit_pastquestion': ('admin', 'past_question'),
+    'delete_pastquestion': ('admin', 'past_question'),
+    'manage_library': ('admin', None),
+    'add_library_resource': ('admin', None),
+    'edit_library_resource': ('admin', 'resource'),
+    'delete_library_resource': ('admin', 'resource'),
+    'manage_testimonials': ('admin', None),
+    'approve_testimonial': ('admin', 'testimonial'),
+    'unapprove_testimonial': ('admin', 'testimonial'),
+    'delete_testimonial': ('admin', 'testimonial'),
+    'manage_announcements': ('admin', None),
+    'add_announcement': ('admin', None),
+    'edit_announcement': ('admin', 'announcement'),
+    'delete_announcement': ('admin', 'announcement'),
+    'manage_departmental_dues': ('admin', None),
+    'add_departmental_dues': ('admin', None),
+    'import_departmental_dues': ('admin', None),
+    'student_lookup': ('admin', None),
+    'import_student_roster': ('admin', None),
+    'edit_departmental_dues': ('admin', 'dues'),
+    'approve_dues': ('admin', 'dues'),
+    'bulk_approve_dues': ('admin', None),
+    'delete_departmental_dues': ('admin', 'dues'),
+    'my_receipt': ('student', None),
+    'print_receipt': ('student', None),
+    'download_receipt': ('student', None),
+    'manage_course_handbook': ('admin', None),
+    'add_course_handbook': ('admin', None),
+    'edit_course_handbook': ('admin', 'handbook'),
+    'delete_course_handbook': ('admin', 'handbook'),
+    'view_course_handbook': ('public', None),
+    'course_autocomplete': ('public', None),
+    'verify_receipt': ('public', None),
+    'manage_timetables': ('admin', None),
+    'add_timetable': ('admin', None),
+    'edit_timetable': ('admin', 'timetable'),
+    'delete_timetable': ('admin', 'timetable'),
+    'view_timetables': ('public', None),
+    'manage_calendars': ('admin', None),
+    'add_calendar': ('admin', None),
+    'edit_calendar': ('admin', 'calendar'),
+    'delete_calendar': ('admin', 'calendar'),
+    'view_calendar': ('public', None),
+}
+
+# Query strings for views that only do real work when given a search term,
+# formatted with the seeded objects
+URL_QUERIES = {
+    'search': 'q=biomaterials',
+    'student_lookup': 'q=2020',
+    'course_autocomplete': 'q=BME',
+    'verify_receipt': 'code={dues.watermark_code}',
+}
+
+
+def seed_rows(admin, student, start, count):
+    """Add count rows of everything the pages list; numbering from start keeps them unique"""
+    for i in range(start, start + count):
+        Staff.objects.create(name=f'Staff {i}', position='Lecturer', bio='Research interests', order=i)
+        Exco.objects.create(name=f'Exco {i}', position='Secretary', bio='Final year', session='2024/2025', order=i)
+        PastQuestion.objects.create(course_code=f'BME {300 + i}', course_title='Biomaterials', level='300',
+                                    semester='First', year=2020 + i % 5, link='https://example.com/pq',
+                                    uploaded_by=admin)
+        LibraryResource.objects.create(title=f'Biomaterials Vol. {i}', author='Ratner', category='Textbook',
+                                       description='Course text', link='https://example.com/book',
+                                       level='300', uploaded_by=admin)
+        Testimonial.objects.create(name=f'Alumnus {i}', message='Great department', is_approved=i % 2 == 0)
+        Announcement.objects.create(title=f'Notice {i}', content='Lectures resume on Monday', created_by=admin)
+        CourseHandbook.objects.create(level=student.level, semester='First', course_code=f'BME {500 + i}',
+                                      course_title='Biomechanics', credit_unit=3, uploaded_by=admin)
+        Timetable.objects.create(title=f'Exam Timetable {i}', timetable_type='Exam', level='300',
+                                 semester='First', academic_session='2024/2025', image='timetable',
+                                 uploaded_by=admin)
+        AcademicCalendar.objects.create(title=f'Calendar {i}', academic_session='2024/2025', image='calendar',
+                                        is_active=i == 0, uploaded_by=admin)
+
+        classmate = Student.objects.create(reg_number=f'2020/{1000 + i}', full_name=f'Classmate {i}', level='300')
+        DepartmentalDues.objects.create(student=classmate, academic_session='2024/2025', is_approved=i % 2 == 0,
+                                        approved_by=admin, approved_at=timezone.now())
+        semester = Semester.objects.create(student=student, name=f'Semester {i}', year='2024/2025')
+        add_courses(semester, [Course(course_code=f'BME {i}{j}', course_name='Course', credit_unit=3,
+                                      grade_point=5.0 - j) for j in range(4)])
+        CGPACalculation.objects.create(student=student, cgpa=4.0 + i / 100, total_credit_units=12 * (i + 1),
+                                       total_grade_points=48.0 * (i + 1))
+
+
+@override_settings(MIDDLEWARE=MIDDLEWARE, QUERY_BUDGET_RAISE=True)
+class QueryCountTests(TestCase):
+    """
+    Every url in core/urls.py is requested with seeded data. Each must stay
+    within its view's query budget, and its query count must not change
+    when there are more rows to show.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.student = Student.objects.create(reg_number='2020/1/12345', full_name='Ada Obi', level='300')
+        seed_rows(cls.admin, cls.student, 0, 3)
+        cls.dues = DepartmentalDues.objects.create(student=cls.student, academic_session='2024/2025',
+                                                   is_approved=True, approved_by=cls.admin,
+                                                   approved_at=timezone.now())
+        cls.semester = cls.student.semesters.first()
+        cls.objects = {
+            'semester': cls.semester,
+            'course': cls.semester.courses.first(),
+            'staff': Staff.objects.first(),
+            'exco': Exco.objects.first(),
+            'past_question': PastQuestion.objects.first(),
+            'resource': LibraryResource.objects.first(),
+            'testimonial': Testimonial.objects.first(),
+            'announcement': Announcement.objects.first(),
+            'dues': cls.dues,
+            'handbook': CourseHandbook.objects.first(),
+            'timetable': Timetable.objects.first(),
+            'calendar': AcademicCalendar.objects.first(),
+        }
+
+    def _client(self, role):
+        client = Client()
+        if role == 'admin':
+            client.force_login(self.admin)
+        elif role == 'student':
+            session = client.session
+            session[STUDENT_SESSION_KEY] = self.student.pk
+            session.save()
+        return client
+
+    def _url(self, name):
+        role, key = URL_CASES[name]
+        pattern = next(pattern for pattern in urlpatterns if pattern.name == name)
+        kwargs = {arg: self.objects[key].pk for arg in pattern.pattern.converters}
+        url = reverse(name, kwargs=kwargs)
+        if name in URL_QUERIES:
+            url = f'{url}?{URL_QUERIES[name].format(**self.objects)}'
+        return role, url
+
+    def _measure(self, name):
+        """(url, response, queries) for one GET, rolled back afterwards so it changes nothing"""
+        role, url = self._url(name)
+        client = self._client(role)
+        cache.clear()
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(url)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                response.close()
+            transaction.set_rollback(True)
+        return url, response, len(queries)
+
+    def test_every_url_has_a_case(self):
+        names = {pattern.name for pattern in urlpatterns}
+        self.assertEqual(names - set(URL_CASES), set(), 'Add the new url to URL_CASES')
+        self.assertEqual(set(URL_CASES) - names, set())
+
+    def test_views_stay_within_query_budget(self):
+        for name in URL_CASES:
+            with self.subTest(url=name):
+                url, response, count = self._measure(name)
+                budget = getattr(resolve(url.split('?')[0]).func, 'query_budget', settings.QUERY_BUDGET_DEFAULT)
+                self.assertLess(response.status_code, 500)
+                self.assertLessEqual(count, budget)
+
+    def test_query_counts_do_not_grow_with_data(self):
+        before = {name: self._measure(name)[2] for name in URL_CASES}
+        seed_rows(self.admin, self.student, 10, 5)
+        for name in URL_CASES:
+            with self.subTest(url=name):
+                self.assertEqual(self._measure(name)[2], before[name])
+
+    def test_middleware_reports_query_count(self):
+        _, response, count = self._measure('student_dashboard')
+        self.assertEqual(response[QUERY_COUNT_HEADER], str(count))
+
+    @override_settings(QUERY_BUDGET_DEFAULT=0)
+    def test_middleware_raises_over_budget(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self._measure('student_profile')
+
+
+@override_settings(MIDDLEWARE=[TIMING_MIDDLEWARE] + [name for name in settings.MIDDLEWARE if name != TIMING_MIDDLEWARE])
+class RequestTimingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = Student.objects.create(reg_number='2020/1/12345', full_name='Ada Obi', level='300')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        session = self.client.session
+        session[STUDENT_SESSION_KEY] = self.student.pk
+        session.save()
+
+    def _get(self, logger='core.timing', level='INFO'):
+        with self.assertLogs(logger, level) as logs:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('student_dashboard'))
+        return response, len(queries), logs.output
+
+    def _staff_get(self, **kwargs):
+        staff = User.objects.create_user('staff', 'staff@example.com', 'password', is_staff=True)
+        self.client.force_login(staff)
+        return self._get(**kwargs)
+
+    def test_server_timing_header(self):
+        response, count, _ = self._staff_get()
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn(f'desc="{count} queries"', response['Server-Timing'])
+        self.assertIn('tpl;dur=', response['Server-Timing'])
+        self.assertIn('view;dur=', response['Server-Timing'])
+
+    def test_server_timing_header_only_for_staff_or_debug(self):
+        response, _, output = self._get()
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(len(output), 1)
+        with self.settings(DEBUG=True):
+            self.assertIn('Server-Timing', self._get()[0])
+
+    @override_settings(DEBUG=True)
+    def test_cache_hits_and_misses(self):
+        self.assertIn('cache;desc="0 hits, 1 misses"', self._get()[0]['Server-Timing'])
+        self.assertIn('cache;desc="1 hits, 0 misses"', self._get()[0]['Server-Timing'])
+
+    def test_logs_each_request(self):
+        _, count, output = self._get()
+        self.assertEqual(len(output), 1)
+        self.assertIn(f'path={reverse("student_dashboard")} status=200', output[0])
+        self.assertIn(f'queries={count} ', output[0])
+
+    @override_settings(SLOW_REQUEST_MS=0)
+    def test_slow_request_logs_queries(self):
+        _, count, output = self._get('core.timing.slow', 'WARNING')
+        self.assertIn('slow request method=GET', output[0])
+        # One line per query after the summary, with the SQL but never its parameters
+        self.assertEqual(len(output[0].splitlines()) - 1, count)
+        self.assertIn('SELECT', output[0])
+        self.assertNotIn(self.student.reg_number, output[0])
+
+    @override_settings(SLOW_REQUEST_MS=0)
+    @mock.patch('core.timing.SLOW_LOG_QUERIES', 2)
+    def test_slow_log_keeps_the_first_queries(self):
+        _, count, output = self._get('core.timing.slow', 'WARNING')
+        self.assertGreater(count, 2)
+        self.assertIn(f'queries={count} ', output[0])
+        self.assertEqual(len(output[0].splitlines()), 3)
+
+    @override_settings(SLOW_REQUEST_MS=60 * 1000)
+    def test_fast_request_is_not_in_the_slow_log(self):
+        with self.assertNoLogs('core.timing.slow'):
+            self._get()
+
+
+class ContentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_homepage_context_is_cached_until_content_changes(self):
+        Staff.objects.create(name='Staff 1', position='Lecturer', bio='Research interests', order=1)
+        self.assertEqual([staff.name for staff in homepage_context()['recent_staff']], ['Staff 1'])
+        with self.assertNumQueries(0):
+            homepage_context()
+
+        Staff.objects.create(name='Staff 0', position='Lecturer', bio='Research interests', order=0)
+        context = homepage_context()
+        self.assertEqual([staff.name for staff in context['recent_staff']], ['Staff 0', 'Staff 1'])
+        self.assertEqual(context['stats']['total_staff'], 2)
+
+
+class CounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reconcile_counters()
+
+    def assertCountersCurrent(self):
+        self.assertEqual(reconcile_counters()[1], {})
+
+    def test_saves_and_deletes_move_counters_without_recounting(self):
+        student = Student.objects.create(reg_number='2020/1/12345', full_name='Ada Obi', level='300')
+        with CaptureQueriesContext(connection) as queries:
+            dues = DepartmentalDues.objects.create(student=student, academic_session='2024/2025')
+            dues.is_approved = True
+            dues.save()
+            testimonial = Testimonial.objects.create(name='Alumnus', message='Great department')
+            testimonial.is_approved = True
+            testimonial.save()
+        self.assertFalse([query['sql'] for query in queries if 'COUNT(' in query['sql']])
+        counters = get_counters()
+        self.assertEqual((counters.total_students, counters.dues_approved, counters.dues_pending), (1, 1, 0))
+        self.assertEqual(counters.testimonials_pending, 0)
+        self.assertCountersCurrent()
+
+        dues.is_approved = False
+        dues.save()
+        self.assertCountersCurrent()
+        dues.delete()
+        testimonial.delete()
+        self.assertCountersCurrent()
+
+    def test_saving_an_existing_row_by_primary_key_is_not_an_addition(self):
+        Student.objects.create(reg_number='2020/1/12345', full_name='Ada Obi', level='300')
+        Student(reg_number='2020/1/12345', full_name='Ada N. Obi', level='300', created_at=timezone.now()).save()
+        self.assertEqual(get_counters().total_students, 1)
+        self.assertCountersCurrent()
+
+
+class CourseAutocompleteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        CourseHandbook.objects.create(level='300', semester='First', course_code='BME 307',
+                                      course_title='Biomaterials', credit_unit=3, uploaded_by=self.admin)
+
+    def codes(self, prefix):
+        return [course['code'] for course in autocomplete.suggest_courses(prefix)]
+
+    def test_matches_code_and_any_title_word(self):
+        self.assertEqual(self.codes('bme30'), ['BME 307'])
+        self.assertEqual(self.codes('BME 3'), ['BME 307'])
+        self.assertEqual(self.codes('materials'), [])
+        self.assertEqual(self.codes('bio'), ['BME 307'])
+
+    def test_version_bumped_by_another_process_rebuilds_the_index(self):
+        self.codes('bme')
+        # A row written and a version bumped elsewhere, as another worker would
+        CourseHandbook.objects.bulk_create([CourseHandbook(level='300', semester='First', course_code='BME 309',
+                                                           course_title='Biomechanics', credit_unit=3,
+                                                           uploaded_by=self.admin)])
+        self.assertEqual(self.codes('bme'), ['BME 307'])
+        cache.set('content:version:handbook', 'elsewhere', None)
+        self.assertEqual(self.codes('bme'), ['BME 307', 'BME 309'])
+
+    def test_index_is_rebuilt_after_max_age(self):
+        self.codes('bme')
+        CourseHandbook.objects.bulk_create([CourseHandbook(level='300', semester='First', course_code='BME 309',
+                                                           course_title='Biomechanics', credit_unit=3,
+                                                           uploaded_by=self.admin)])
+        autocomplete._local_index['built'] -= autocomplete.INDEX_MAX_AGE + 1
+        self.assertEqual(self.codes('bme'), ['BME 307', 'BME 309'])
+
+
+class PlannerTests(TestCase):
+    def test_minimum_plan_raises_the_heaviest_courses_just_enough(self):
+        # 6 credits: all E gives 6 points, so 4 more come from raising 3 then 2 credits to D
+        self.assertEqual(minimum_plan([3, 2, 1], 10), [3, 3, 4])
+        self.assertEqual(minimum_plan([3, 2, 1], 6), [4, 4, 4])
+        self.assertEqual(minimum_plan([3, 2, 1], 0), [5, 5, 5])
+        self.assertEqual(minimum_plan([3, 2, 1], 30), [0, 0, 0])
+        self.assertIsNone(minimum_plan([3, 2, 1], 30.5))
+
+    def test_points_distribution_is_exact(self):
+        probabilities = [0.5, 0.2, 0.1, 0.1, 0.05, 0.05]
+        self.assertEqual(points_distribution([2], probabilities),
+                         [0.05, 0, 0.05, 0, 0.1, 0, 0.1, 0, 0.2, 0, 0.5])
+        distribution = points_distribution([3, 2, 4], probabilities)
+        self.assertAlmostEqual(sum(distribution), 1.0)
+        self.assertAlmostEqual(distribution[45], 0.5 ** 3)
+
+    def test_plan_cgpa(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        student = Student.objects.create(reg_number='2020/1/12345', full_name='Ada Obi', level='300')
+        for code in ('BME 301', 'BME 303'):
+            CourseHandbook.objects.create(level='300', semester='First', course_code=code,
+                                          course_title='Biomaterials', credit_unit=3, uploaded_by=admin)
+
+        plan = plan_cgpa(student, 5.0)
+        self.assertEqual(plan['required_average'], 5.0)
+        self.assertEqual([course['grade'] for course in plan['plan']], ['A', 'A'])
+        # No grades recorded yet, so every grade is equally likely
+        self.assertEqual(plan['probability'], round(1 / 36, 4))
+        self.assertAlmostEqual(sum(row['probability'] for row in plan['distribution']), 1.0, places=3)
+        self.assertLessEqual(plan['percentiles']['p10'], plan['percentiles']['p90'])
+
+
+@override_settings(MIDDLEWARE=MIDDLEWARE)
+class ReceiptVerificationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_public_result_does_not_identify_the_student(self):
+        student = Student.objects.create(reg_number='2020/1/12345', full_name='Ada Obi', level='300')
+        dues = DepartmentalDues.objects.create(student=student, academic_session='2024/2025')
+        response = self.client.get(reverse('verify_receipt'), {'code': dues.watermark_code, 'format': 'json'})
+        self.assertEqual(response.json(), {'valid': True, 'code': dues.watermark_code, 'approved': False,
+                                           'academic_session': '2024/2025'})
+        page = self.client.get(reverse('verify_receipt'), {'code': dues.receipt_number})
+        self.assertNotContains(page, student.reg_number)
+
+    @override_settings(RATELIMIT_TRUSTED_PROXIES=1)
+    def test_client_ip_is_the_address_the_trusted_proxy_saw(self):
+        factory = RequestFactory()
+        # The client forged the first entry; the proxy appended the real address
+        request = factory.get('/', HTTP_X_FORWARDED_FOR='1.2.3.4, 203.0.113.7', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(client_ip(request), '203.0.113.7')
+        self.assertEqual(client_ip(factory.get('/', REMOTE_ADDR='10.0.0.1')), '10.0.0.1')
+        with self.settings(RATELIMIT_TRUSTED_PROXIES=0):
+            self.assertEqual(client_ip(request), '10.0.0.1')
+
+    @override_settings(RATELIMIT_TRUSTED_PROXIES=1)
+    @mock.patch('core.ratelimit.time.time', return_value=6000.0)
+    def test_rate_limit_is_per_forwarded_client(self, _):
+        url = reverse('verify_receipt')
+        for _ in range(60):
+            self.client.get(url, {'code': 'BME-0', 'format': 'json'}, HTTP_X_FORWARDED_FOR='203.0.113.7')
+        limited = self.client.get(url, {'code': 'BME-0', 'format': 'json'}, HTTP_X_FORWARDED_FOR='203.0.113.7')
+        self.assertEqual(limited.status_code, 429)
+        other = self.client.get(url, {'code': 'BME-0', 'format': 'json'}, HTTP_X_FORWARDED_FOR='203.0.113.8')
+        self.assertEqual(other.status_code, 200)
+
+
+def upload(name, text):
+    return SimpleUploadedFile(name, text.encode() if isinstance(text, str) else text)
+
+
+class DuesImportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for i in range(3):
+            Student.objects.create(reg_number=f'2020/{1000 + i}', full_name=f'Student {i}', level='300')
+
+    def _import(self, text, name='dues.csv'):
+        return import_dues(read_rows(upload(name, text)), '2024/2025', Decimal('5000'))
+
+    def test_imports_rows_and_reports_the_rest(self):
+        report = self._import('Reg No,Amount,Reference\n'
+                              '2020/1000,"5,000.00",REF-1\n'
+                              '2020/1001,,\n'
+                              '2020/1000,5000,REF-2\n'
+                              '2020/1002,5000,REF-1\n'
+                              '2020/9999,5000,\n')
+        self.assertEqual([dues.student_id for dues in report['created']], ['2020/1000', '2020/1001'])
+        self.assertEqual(len({dues.receipt_number for dues in report['created']}), 2)
+        self.assertEqual([row['line'] for row in report['duplicates']], [4, 5])
+        self.assertEqual([row['line'] for row in report['unmatched']], [6])
+        self.assertEqual(DepartmentalDues.objects.get(student_id='2020/1000').amount_paid, Decimal('5000.00'))
+
+    def test_imported_receipts_replace_cached_misses(self):
+        watermark = 'BME-0123456789AB'
+        number = ReceiptSequence.format(timezone.localdate().year, 1)
+        self.assertFalse(verify_receipt(watermark)['valid'])
+        self.assertFalse(verify_receipt(number)['valid'])
+        with mock.patch('core.dues_import.uuid.uuid4', return_value=mock.Mock(hex='0123456789ab' * 3)):
+            report = self._import('reg_number,payment_reference\n2020/1000,REF-1\n')
+        dues = report['created'][0]
+        self.assertEqual((dues.watermark_code, dues.receipt_number), (watermark, number))
+        self.assertTrue(verify_receipt(watermark)['valid'])
+        self.assertTrue(verify_receipt(number)['valid'])
+
+    def test_rejects_amounts_and_text_that_do_not_fit(self):
+        report = self._import('reg_number,amount_paid,academic_session,payment_reference\n'
+                              '2020/1000,NaN,,\n'
+                              '2020/1000,Infinity,,\n'
+                              '2020/1000,-5,,\n'
+                              '2020/1000,100000000,,\n'
+                              f'2020/1000,5000,{"2" * 21},\n'
+                              f'2020/1000,5000,,{"R" * 101}\n')
+        self.assertEqual(report['created'], [])
+        self.assertEqual([row['line'] for row in report['invalid']], [2, 3, 4, 5, 6, 7])
+        self.assertFalse(DepartmentalDues.objects.exists())
+
+    def test_unreadable_files_raise_import_file_error(self):
+        for name, content in [('dues.csv', b'reg_number\n\xff\xfe2020/1000\n'),
+                              ('dues.csv', 'reg_number\n' + 'x' * (csv.field_size_limit() + 1) + '\n'),
+                              ('dues.xlsx', b'not a zip file'),
+                              ('dues.txt', 'reg_number\n')]:
+            with self.subTest(name=name), self.assertRaises(ImportFileError):
+                self._import(content, name)
+
+
+@override_settings(MIDDLEWARE=MIDDLEWARE)
+class CourseBatchTests(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create(reg_number='2020/1/12345', full_name='Ada Obi', level='300')
+        self.semester = Semester.objects.create(student=self.student, name='First', year='2024/2025')
+        self.kept, self.dropped = add_courses(self.semester, [
+            Course(course_code='BME 301', course_name='Biomaterials', credit_unit=3, grade_point=4.0),
+            Course(course_code='BME 303', course_name='Biomechanics', credit_unit=2, grade_point=2.0),
+        ])
+        session = self.client.session
+        session[STUDENT_SESSION_KEY] = self.student.pk
+        session.save()
+        self.url = reverse('course_batch', args=[self.semester.pk])
+
+    def _post(self, payload):
+        return self.client.post(self.url, json.dumps(payload), content_type='application/json')
+
+    def _state(self):
+        self.semester.refresh_from_db()
+        courses = list(self.semester.courses.order_by('course_code')
+                       .values_list('course_code', 'credit_unit', 'grade_point'))
+        return courses, self.semester.total_credits, self.semester.gpa
+
+    def test_creates_updates_and_deletes_together(self):
+        response = self._post({
+            'create': [{'course_code': 'BME 305', 'course_name': 'Biosensors', 'credit_unit': 3, 'grade_point': 5}],
+            'update': [{'id': self.kept.pk, 'course_code': 'BME 301', 'course_name': 'Biomaterials',
+                        'credit_unit': 3, 'grade_point': 3}],
+            'delete': [self.dropped.pk],
+        })
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self._state(), ([('BME 301', 3, 3.0), ('BME 305', 3, 5.0)], 6, 4.0))
+        self.assertEqual(response.json()['cgpa'], 4.0)
+
+    def test_any_invalid_course_rejects_the_whole_batch(self):
+        before = self._state()
+        response = self._post({
+            'create': [{'course_code': 'BME 305', 'course_name': 'Biosensors', 'credit_unit': 3, 'grade_point': 5},
+                       {'course_code': 'BME 307', 'course_name': 'Imaging', 'credit_unit': 3, 'grade_point': 7}],
+            'update': [{'id': 0, 'course_code': 'BME 301'}],
+            'delete': [self.dropped.pk, 0],
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()['errors']), {'create.1', 'update.0', 'delete.1'})
+        self.assertEqual(self._state(), before)
+
+    def test_a_course_can_only_be_changed_once_per_batch(self):
+        before = self._state()
+        row = {'id': self.kept.pk, 'course_code': 'BME 301', 'course_name': 'Biomaterials', 'credit_unit': 3}
+        response = self._post({
+            'update': [{**row, 'grade_point': 1}, {**row, 'grade_point': 2},
+                       {'id': self.dropped.pk, 'course_code': 'BME 303', 'course_name': 'Biomechanics',
+                        'credit_unit': 2, 'grade_point': 5}],
+            'delete': [self.dropped.pk],
+        })
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['errors']
+        self.assertEqual(set(errors), {'update.1', 'update.2'})
+        self.assertEqual(errors['update.1']['id'][0]['code'], 'duplicate')
+        self.assertEqual(self._state(), before)
+        self.assertEqual(rebuild_totals(fix=False), ([], []))
+
+    def test_malformed_requests(self):
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+        for body in ('not json', json.dumps({'delete': ['x']}), json.dumps({'update': [{'code': 'BME 301'}]}),
+                     json.dumps({'delete': list(range(51))})):
+            with self.subTest(body=body[:20]):
+                response = self.client.post(self.url, body, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+
+    def test_a_failure_while_saving_rolls_back_every_change(self):
+        before = self._state()
+        with mock.patch.object(cgpa, 'apply_delta', side_effect=RuntimeError), self.assertRaises(RuntimeError):
+            self._post({
+                'create': [{'course_code': 'BME 305', 'course_name': 'Biosensors', 'credit_unit': 3,
+                            'grade_point': 5}],
+                'delete': [self.dropped.pk],
+            })
+        self.assertEqual(self._state(), before)
+
+
+@override_settings(MIDDLEWARE=MIDDLEWARE)
+class ReceiptSequenceTests(TransactionTestCase):
+    def test_allocations_never_overlap(self):
+        self.assertEqual(ReceiptSequence.allocate(2, year=2024), ['BME/2024/0001', 'BME/2024/0002'])
+        self.assertEqual(ReceiptSequence.allocate(1, year=2025), ['BME/2025/0001'])
+
+        numbers = []
+        def allocate():
+            try:
+                while True:
+                    try:
+                        numbers.extend(ReceiptSequence.allocate(5, year=2024))
+                        return
+                    except OperationalError:
+                        # The in-memory SQLite test database reports a locked
+                        # table instead of waiting for the other writer
+                        time.sleep(0.01)
+            finally:
+                connection.close()
+        threads = [threading.Thread(target=allocate) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(numbers), [ReceiptSequence.format(2024, n) for n in range(3, 43)])
+        self.assertEqual(ReceiptSequence.objects.get(year=2024).last_number, 42)
+
+    def test_admin_cannot_edit_the_sequence(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        ReceiptSequence.allocate(1, year=2024)
+        self.client.force_login(admin)
+        url = reverse('admin:core_receiptsequence_change', args=[2024])
+        self.client.post(url, {'year': 2024, 'last_number': 0})
+        self.assertEqual(ReceiptSequence.objects.get(year=2024).last_number, 1)
+        self.assertEqual(self.client.get(reverse('admin:core_receiptsequence_add')).status_code, 403)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        PastQuestion.objects.create(course_code='BME307', course_title='Biomaterials', level='300',
+                                    semester='First', year=2023, link='https://example.com/pq', uploaded_by=admin)
+        CourseHandbook.objects.create(level='300', semester='First', course_code='BME 307',
+                                      course_title='Biomaterials', credit_unit=3, uploaded_by=admin)
+        CourseHandbook.objects.create(level='300', semester='First', course_code='BME 301',
+                                      course_title='Biomechanics 307', credit_unit=3, uploaded_by=admin)
+
+    def test_course_codes_match_with_or_without_the_space(self):
+        for text in ('BME 307', 'bme307', 'BME307 biomaterials'):
+            with self.subTest(text=text):
+                titles = sorted(result['title'] for result in search(text))
+                self.assertEqual(titles, ['BME 307 - Biomaterials', 'BME307 - Biomaterials'])
+
+    def test_punctuation_only_searches_find_nothing(self):
+        self.assertIsNone(_postgres_query('!!!'))
+        self.assertIsNotNone(_postgres_query('BME 307 --'))
+        self.assertEqual(search('--'), [])
+
+
+@override_settings(MIDDLEWARE=MIDDLEWARE)
+class CGPATotalsTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.student = Student.objects.create(reg_number='2020/1/12345', full_name='Ada Obi', level='300')
+        self.first = Semester.objects.create(student=self.student, name='First', year='2024/2025')
+        self.second = Semester.objects.create(student=self.student, name='Second', year='2024/2025')
+        self.courses = add_courses(self.first, [
+            Course(course_code='BME 301', course_name='Biomaterials', credit_unit=3, grade_point=5.0),
+            Course(course_code='BME 303', course_name='Biomechanics', credit_unit=2, grade_point=3.0),
+            Course(course_code='BME 305', course_name='Biosensors', credit_unit=1, grade_point=0.0),
+        ])
+
+    def assertTotals(self, first, second, cgpa):
+        """(courses, credits, gpa) of each semester and the stored CGPA, which must match a rebuild"""
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.student.cgpa_summary.refresh_from_db()
+        self.assertEqual((self.first.courses_count, self.first.total_credits, self.first.gpa), first)
+        self.assertEqual((self.second.courses_count, self.second.total_credits, self.second.gpa), second)
+        self.assertEqual(self.student.cgpa_summary.cgpa, cgpa)
+        self.assertEqual(rebuild_totals(fix=False), ([], []))
+
+    def test_deltas_track_adds_edits_and_deletes(self):
+        self.assertTotals((3, 6, 3.5), (0, 0, 0.0), 3.5)
+
+        course = self.courses[1]
+        previous = course_contribution(course)
+        course.credit_unit, course.grade_point = 4, 4.0
+        course.save()
+        course_changed(course, previous)
+        self.assertTotals((3, 8, 3.88), (0, 0, 0.0), 3.88)
+
+        course.delete()
+        course_removed(course)
+        self.assertTotals((2, 4, 3.75), (0, 0, 0.0), 3.75)
+
+        sync_courses(self.second, created=[Course(course_code='BME 302', course_name='Imaging', credit_unit=2,
+                                                  grade_point=2.0)])
+        self.assertTotals((2, 4, 3.75), (1, 2, 2.0), 3.17)
+
+    def test_admin_changes_move_the_totals(self):
+        self.client.force_login(self.admin)
+        data = {'semester': self.first.pk, 'course_code': 'BME 307', 'course_name': 'Imaging',
+                'credit_unit': 2, 'grade_point': 4.0}
+        self.client.post(reverse('admin:core_course_add'), data)
+        self.assertTotals((4, 8, 3.62), (0, 0, 0.0), 3.62)
+
+        course = Course.objects.get(course_code='BME 307')
+        self.client.post(reverse('admin:core_course_change', args=[course.pk]),
+                         {**data, 'semester': self.second.pk, 'grade_point': 5.0})
+        self.assertTotals((3, 6, 3.5), (1, 2, 5.0), 3.88)
+
+        self.client.post(reverse('admin:core_course_delete', args=[course.pk]), {'post': 'yes'})
+        self.assertTotals((3, 6, 3.5), (0, 0, 0.0), 3.5)
+
+        self.client.post(reverse('admin:core_course_changelist'), {
+            'action': 'delete_selected', 'post': 'yes',
+            '_selected_action': [self.courses[0].pk, self.courses[2].pk],
+        })
+        self.assertTotals((1, 2, 3.0), (0, 0, 0.0), 3.0)
+
+        self.client.post(reverse('admin:core_semester_delete', args=[self.first.pk]), {'post': 'yes'})
+        self.student.cgpa_summary.refresh_from_db()
+        self.assertEqual((self.student.cgpa_summary.total_credits, self.student.cgpa_summary.cgpa), (0, 0.0))
+        self.assertEqual(rebuild_totals(fix=False), ([], []))
+
+
+class DuesApprovalTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.dues = [
+            DepartmentalDues.objects.create(student=Student.objects.create(
+                reg_number=f'2020/{1000 + i}', full_name=f'Student {i}', level='300'), academic_session='2024/2025')
+            for i in range(5)
+        ]
+        reconcile_counters()
+
+    def test_bulk_approval_refreshes_verifications_and_counters(self):
+        # Cache "not yet approved" for every receipt, by both codes
+        for dues in self.dues:
+            self.assertFalse(verify_receipt(dues.watermark_code)['approved'])
+            self.assertFalse(verify_receipt(dues.receipt_number)['approved'])
+        get_counters()
+
+        progress = list(approve_pending(pending_dues('2024/2025', '300'), self.admin, batch_size=2))
+        self.assertEqual(progress, [(2, 5), (4, 5), (5, 5)])
+        for dues in self.dues:
+            self.assertTrue(verify_receipt(dues.watermark_code)['approved'])
+            self.assertTrue(verify_receipt(dues.receipt_number)['approved'])
+        self.assertEqual((get_counters().dues_approved, get_counters().dues_pending), (5, 0))
+        self.assertEqual(reconcile_counters()[1], {})
+
+
+class RosterImportTests(TestCase):
+    def setUp(self):
+        Student.objects.create(reg_number='2020/1000', full_name='Already Registered', level='300')
+
+    def _import(self, text, **kwargs):
+        return import_roster(read_rows(upload('roster.csv', text), required=ROSTER_COLUMNS), **kwargs)
+
+    def test_imports_rows_and_reports_the_rest(self):
+        report = self._import('Reg No,Name,Level,Email\n'
+                              '2020/1001,  Ada   Obi ,300L,ada@example.com\n'
+                              '2020/1002,Chi Eze,,\n'
+                              '2020/1000,Already Registered,300,\n'
+                              '2020/1001,Ada Obi,300,\n'
+                              '20-1003,Bad Number,300,\n'
+                              '2020/1004,Bad Level,700,\n'
+                              '2020/1005,Bad Email,300,not-an-email\n', level='200', batch_size=2)
+        self.assertEqual(report['created'], 2)
+        self.assertEqual([row['line'] for row in report['existing']], [4])
+        self.assertEqual([row['line'] for row in report['duplicates']], [5])
+        self.assertEqual([row['line'] for row in report['invalid']], [6, 7, 8])
+        self.assertEqual(list(Student.objects.filter(reg_number__in=['2020/1001', '2020/1002'])
+                              .order_by('pk').values_list('full_name', 'level')),
+                         [('Ada Obi', '300'), ('Chi Eze', '200')])
+
+    def test_students_registered_during_the_import_are_not_counted(self):
+        bulk_create = Student.objects.bulk_create
+
+        def register_first(students, **kwargs):
+            # A student self-registers between the lookup and the insert
+            Student.objects.create(reg_number=students[0].pk, full_name='Self Registered', level='100')
+            return bulk_create(students, **kwargs)
+
+        with mock.patch.object(Student.objects, 'bulk_create', side_effect=register_first):
+            report = self._import('reg_number,full_name\n2020/1001,Ada Obi\n2020/1002,Chi Eze\n')
+        self.assertEqual(report['created'], 1)
+        self.assertEqual([row['line'] for row in report['existing']], [2])
+        self.assertEqual(Student.objects.get(pk='2020/1001').full_name, 'Self Registered')
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        # Three sort-key values with several rows each, so the pk breaks the ties
+        for i in range(10):
+            Staff.objects.create(name=f'Staff {i % 3}', position='Lecturer', bio='Research interests', order=i % 2)
+        self.expected = list(Staff.objects.order_by('order', 'name', 'pk').values_list('pk', flat=True))
+
+    def _page(self, query=''):
+        return paginate_keyset(RequestFactory().get(f'/?{query}'), Staff.objects.all(), per_page=3)
+
+    def test_walks_every_row_once_in_both_directions(self):
+        pages = [self._page()]
+        while pages[-1].has_next:
+            pages.append(self._page(pages[-1].next_query))
+        self.assertEqual([staff.pk for page in pages for staff in page], self.expected)
+        self.assertEqual([len(page) for page in pages], [3, 3, 3, 1])
+        self.assertFalse(pages[0].has_previous)
+
+        back = [pages[-1]]
+        while back[-1].has_previous:
+            back.append(self._page(back[-1].previous_query))
+        self.assertEqual([[staff.pk for staff in page] for page in back],
+                         [[staff.pk for staff in page] for page in reversed(pages)])
+
+    def test_cursor_round_trips_timestamps_to_the_microsecond(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        announcement = Announcement.objects.create(title='Notice', content='Lectures resume', created_by=admin)
+        ordering = _ordering(Announcement.objects.all())
+        values = [announcement.created_at, announcement.pk]
+        self.assertEqual(decode_cursor(encode_cursor('prev', values), ordering), ('prev', values))
+
+    def test_tampered_cursors_fall_back_to_the_first_page(self):
+        ordering = _ordering(Staff.objects.all())
+        first = [staff.pk for staff in self._page()]
+        for cursor in ('not base64!', encode_cursor('sideways', [0, 'Staff 0', 1]),
+                       encode_cursor('next', [0, 'Staff 0']), encode_cursor('next', [0, 'Staff 0', 'x']),
+                       encode_cursor('next', {'order': 0})):
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(decode_cursor(cursor, ordering))
+                self.assertEqual([staff.pk for staff in self._page(f'cursor={cursor}')], first)
+
+
+@override_settings(MIDDLEWARE=MIDDLEWARE)
+class ReceiptPdfTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.student = Student.objects.create(reg_number='2020/1/12345', full_name='Ada Obi', level='300')
+        DepartmentalDues.objects.create(student=self.student, academic_session='2024/2025', is_approved=True,
+                                        approved_by=admin, approved_at=timezone.now())
+        session = self.client.session
+        session[STUDENT_SESSION_KEY] = self.student.pk
+        session.save()
+
+    def _download(self):
+        response = self.client.get(reverse('download_receipt'))
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        return response.content
+
+    def test_rendered_once_until_the_student_changes(self):
+        with mock.patch('core.receipt_pdf.render_receipt', wraps=render_receipt) as render:
+            first = self._download()
+            self.assertEqual(self._download(), first)
+            self.assertEqual(render.call_count, 1)
+            self.student.full_name = 'Ada N. Obi'
+            self.student.save()
+            self._download()
+            self.assertEqual(render.call_count, 2)
+            self.assertEqual(render.call_args[0][0]['full_name'], 'Ada N. Obi')
+
+    def test_prerender_fills_the_cache(self):
+        call_command('prerender_receipts', session='2024/2025', base_url='http://testserver',
+                     stdout=io.StringIO())
+        with mock.patch('core.receipt_pdf.render_receipt', wraps=render_receipt) as render:
+            self._download()
+        render.assert_not_called()
+
+
+class AnalyticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # CGPAs 5.0, 4.0, 4.0, 2.0 at 300 level and 3.0 at 200 level
+        for i, (level, grade) in enumerate([('300', 5.0), ('300', 4.0), ('300', 4.0), ('300', 2.0), ('200', 3.0)]):
+            student = Student.objects.create(reg_number=f'2020/{1000 + i}', full_name=f'Student {i}', level=level)
+            semester = Semester.objects.create(student=student, name='First', year='2024/2025')
+            add_courses(semester, [Course(course_code='BME 301', course_name='Biomaterials', credit_unit=3,
+                                          grade_point=grade)])
+
+    def test_ranks_within_the_level_share_ties(self):
+        ranks = {reg_number: student_rank(reg_number) for reg_number in get_snapshot()['ranks']}
+        self.assertEqual(ranks['2020/1000'], {'rank': 1, 'of': 4, 'percentile': 75.0})
+        self.assertEqual(ranks['2020/1001'], {'rank': 2, 'of': 4, 'percentile': 25.0})
+        self.assertEqual(ranks['2020/1002'], {'rank': 2, 'of': 4, 'percentile': 25.0})
+        self.assertEqual(ranks['2020/1003'], {'rank': 4, 'of': 4, 'percentile': 0.0})
+        self.assertEqual(ranks['2020/1004'], {'rank': 1, 'of': 1, 'percentile': 0.0})
+        self.assertIsNone(student_rank('2020/9999'))
+
+
+class StudentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Student.objects.create(reg_number='2020/1/12345', full_name='Ada Obi', level='300')
+
+    def test_student_is_cached_between_requests(self):
+        with self.assertNumQueries(1):
+            load_student('2020/1/12345')
+        with self.assertNumQueries(0):
+            self.assertEqual(load_student('2020/1/12345').full_name, 'Ada Obi')
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+                                           'LOCATION': 'django_cache'}})
+    def test_database_cache_reads_the_student_directly(self):
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                self.assertEqual(load_student('2020/1/12345').full_name, 'Ada Obi')
@@ -0,0 +1,181 @@
+# Per-request timings for production. RequestTimingMiddleware measures the
+# time a request spends in the database (through connection.execute_wrapper),
+# rendering templates and in the view overall, and counts cache hits and
+# misses. The numbers go out as one key=value log line per request and, to
+# staff users or with DEBUG on, as a Server-Timing header; requests slower
+# than SLOW_REQUEST_MS are also logged to core.timing.slow with the SQL
+# they ran. Template and cache calls are timed by wrapping the template
+# backend and cache backend methods once per process; the wrappers do
+# nothing outside a request.
+import functools
+import logging
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import Template
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger(__name__ + '.slow')
+
+DEFAULT_SLOW_REQUEST_MS = 500
+# Queries kept for the slow log; a request running more is already the problem
+SLOW_LOG_QUERIES = 100
+
+_current = ContextVar('request_timing', default=None)
+_MISSING = object()
+
+
+class RequestTiming:
+    def __init__(self):
+        self.db = 0.0
+        self.queries = []
+        self.query_count = 0
+        self.template = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.in_cache = False
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.db += elapsed
+            self.query_count += 1
+            # SQL only, never params: they hold registration numbers and emails
+            if len(self.queries) < SLOW_LOG_QUERIES:
+                self.queries.append((elapsed, sql))
+
+
+def _timed_render(render):
+    @functools.wraps(render)
+    def wrapper(self, context=None, request=None):
+        timing = _current.get()
+        if timing is None:
+            return render(self, context, request)
+        started = time.perf_counter()
+        try:
+            return render(self, context, request)
+        finally:
+            timing.template += time.perf_counter() - started
+    wrapper.timed = True
+    return wrapper
+
+
+def _counted_get(get):
+    @functools.wraps(get)
+    def wrapper(self, key, default=None, version=None):
+        timing = _current.get()
+        # get_many() and get_or_set() of some backends go through get()
+        if timing is None or timing.in_cache:
+            return get(self, key, default, version)
+        timing.in_cache = True
+        try:
+            value = get(self, key, _MISSING, version)
+        finally:
+            timing.in_cache = False
+        if value is _MISSING:
+            timing.cache_misses += 1
+            return default
+        timing.cache_hits += 1
+        return value
+    wrapper.timed = True
+    return wrapper
+
+
+def _counted_get_many(get_many):
+    @functools.wraps(get_many)
+    def wrapper(self, keys, version=None):
+        timing = _current.get()
+        if timing is None or timing.in_cache:
+            return get_many(self, keys, version)
+        keys = list(keys)
+        timing.in_cache = True
+        try:
+            found = get_many(self, keys, version)
+        finally:
+            timing.in_cache = False
+        timing.cache_hits += len(found)
+        timing.cache_misses += len(keys) - len(found)
+        return found
+    wrapper.timed = True
+    return wrapper
+
+
+def install_timers():
+    """Wrap template rendering and the configured cache backends; safe to call again"""
+    if not getattr(Template.render, 'timed', False):
+        Template.render = _timed_render(Template.render)
+    for options in settings.CACHES.values():
+        backend = import_string(options['BACKEND'])
+        if not getattr(backend.get, 'timed', False):
+            backend.get = _counted_get(backend.get)
+        if not getattr(backend.get_many, 'timed', False):
+            backend.get_many = _counted_get_many(backend.get_many)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1)
+
+
+def shows_timing(request):
+    """Whether to send Server-Timing: it exposes query counts and timings, so staff or DEBUG only"""
+    if settings.DEBUG:
+        return True
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_staff
+
+
+class RequestTimingMiddleware:
+    """
+    Time each request and report it in a log line, when slow the slow log
+    and, for staff, a Server-Timing header. Work a streaming response does
+    while it is being sent is not included.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow = getattr(settings, 'SLOW_REQUEST_MS', DEFAULT_SLOW_REQUEST_MS) / 1000
+        install_timers()
+
+    def __call__(self, request):
+        timing = RequestTiming()
+        token = _current.set(timing)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timing))
+                response = self.get_response(request)
+                # Inside the timers: for a view that never touched request.user this loads it
+                show = shows_timing(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - started
+
+        if show:
+            response['Server-Timing'] = (
+                f'db;dur={_ms(timing.db)};desc="{timing.query_count} queries", '
+                f'tpl;dur={_ms(timing.template)}, '
+                f'cache;desc="{timing.cache_hits} hits, {timing.cache_misses} misses", '
+                f'view;dur={_ms(total)}'
+            )
+        if total >= self.slow:
+            slow_logger.warning(
+                'slow request %s\n%s', self._line(request, response, timing, total),
+                '\n'.join(f'  {_ms(elapsed):>8}ms  {sql}' for elapsed, sql in timing.queries),
+            )
+        elif logger.isEnabledFor(logging.INFO):
+            logger.info('%s', self._line(request, response, timing, total))
+        return response
+
+    def _line(self, request, response, timing, total):
+        return (
+            f'method={request.method} path={request.path} status={response.status_code} '
+            f'dur={_ms(total)} db={_ms(timing.db)} queries={timing.query_count} '
+            f'tpl={_ms(timing.template)} cache_hits={timing.cache_hits} cache_misses={timing.cache_misses}'
+        )
@@ -10,6 +10,7 @@ urlpatterns = [
     path('excos/', views.exco_list, name='exco_list'),
     path('past-questions/', views.past_questions, name='past_questions'),
     path('library/', views.library, name='library'),
+    path('search/', views.search, name='search'),
     path('submit-testimonial/', views.submit_testimonial, name='submit_testimonial'),
     
     # Student Portal
@@ -26,10 +27,13 @@ urlpatterns = [
     path('student/semester/<int:pk>/edit/', views.edit_semester, name='edit_semester'),
     path('student/semester/<int:pk>/delete/', views.delete_semester, name='delete_semester'),
     path('student/semester/<int:semester_id>/course/add/', views.add_course, name='add_course'),
+    path('student/semester/<int:semester_id>/fill-from-handbook/', views.fill_semester_from_handbook, name='fill_semester_from_handbook'),
+    path('student/semester/<int:semester_id>/courses/batch/', views.course_batch, name='course_batch'),
     path('student/course/<int:pk>/edit/', views.edit_course, name='edit_course'),
     path('student/course/<int:pk>/delete/', views.delete_course, name='delete_course'),
     path('student/calculate-cgpa/', views.calculate_cgpa, name='calculate_cgpa'),
     path('student/cgpa-history/', views.cgpa_history, name='cgpa_history'),
+    path('student/cgpa-planner/', views.cgpa_planner, name='cgpa_planner'),
     
     # Admin Authentication
     path('encrypted/admin/futobme/login/', views.admin_login, name='admin_login'),
@@ -37,6 +41,7 @@ urlpatterns = [
     
     # Admin Dashboard
     path('encrypted/admin/futobme/dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('encrypted/admin/futobme/analytics/', views.cohort_analytics, name='cohort_analytics'),
     
     # Staff Management
     path('encrypted/admin/futobme/staff/', views.manage_staff, name='manage_staff'),
@@ -77,13 +82,18 @@ urlpatterns = [
     # ==================== DEPARTMENTAL DUES URLs ====================
     path('encrypted/admin/futobme/dues/', views.manage_departmental_dues, name='manage_departmental_dues'),
     path('encrypted/admin/futobme/dues/add/', views.add_departmental_dues, name='add_departmental_dues'),
+    path('encrypted/admin/futobme/dues/import/', views.import_departmental_dues, name='import_departmental_dues'),
+    path('encrypted/admin/futobme/students/lookup/', views.student_lookup, name='student_lookup'),
+    path('encrypted/admin/futobme/students/import/', views.import_student_roster, name='import_student_roster'),
     path('encrypted/admin/futobme/dues/edit/<int:pk>/', views.edit_departmental_dues, name='edit_departmental_dues'),
     path('encrypted/admin/futobme/dues/approve/<int:pk>/', views.approve_dues, name='approve_dues'),
+    path('encrypted/admin/futobme/dues/bulk-approve/', views.bulk_approve_dues, name='bulk_approve_dues'),
     path('encrypted/admin/futobme/dues/delete/<int:pk>/', views.delete_departmental_dues, name='delete_departmental_dues'),
     
     # Student Receipt URLs
     path('student/my-receipt/', views.my_receipt, name='my_receipt'),
     path('student/print-receipt/', views.print_receipt, name='print_receipt'),
+    path('student/receipt.pdf', views.download_receipt, name='download_receipt'),
     
     # ==================== COURSE HANDBOOK URLs ====================
     path('encrypted/admin/futobme/handbook/', views.manage_course_handbook, name='manage_course_handbook'),
@@ -93,6 +103,8 @@ urlpatterns = [
     
     # Public Course Handbook URL
     path('course-handbook/', views.view_course_handbook, name='view_course_handbook'),
+    path('course-handbook/autocomplete/', views.course_autocomplete, name='course_autocomplete'),
+    path('receipts/verify/', views.verify_receipt, name='verify_receipt'),
     
     # ==================== TIMETABLE URLs ====================
     path('encrypted/admin/futobme/timetables/', views.manage_timetables, name='manage_timetables'),
@@ -2,51 +2,50 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Count, Sum, Avg
+from django.db import transaction
+from django.db.models import Count, Sum, Avg, Q
 from .models import( Staff, Exco, PastQuestion, 
                     LibraryResource, Testimonial, Announcement, 
-                    Student, Semester, Course, CGPACalculation, DepartmentalDues, 
+                    Student, Semester, Course, DepartmentalDues, 
                     CourseHandbook, Timetable, AcademicCalendar)
 from .forms import (StaffForm, ExcoForm, PastQuestionForm, LibraryResourceForm, TestimonialForm, 
                     AnnouncementForm, StudentRegistrationForm, StudentLoginForm, 
-                    StudentProfileForm, SemesterForm, CourseForm,  DepartmentalDuesForm,
-                    CourseHandbookForm, TimetableForm, AcademicCalendarForm)
+                    StudentProfileForm, SemesterForm, CourseForm, HandbookSemesterForm, CGPAPlannerForm, DepartmentalDuesForm,
+                    CourseHandbookForm, TimetableForm, AcademicCalendarForm, DuesImportForm,
+                    RosterImportForm)
 import json
 from django.utils import timezone
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.core.paginator import Paginator
 from django.template.loader import render_to_string
+from functools import wraps
+from .middleware import load_student
+from .content_cache import homepage_context
+from .counters import get_counters
+from .pagination import paginate_keyset
+from .search import search as site_search, SEARCH_SOURCES
+from .autocomplete import suggest_courses, suggest_students, DEFAULT_SUGGESTIONS, MAX_STUDENT_RESULTS
+from .planner import plan_cgpa
+from .analytics import get_snapshot, refresh_snapshot
+from .dues_import import read_rows, import_dues, ImportFileError
+from .roster_import import import_roster, ROSTER_COLUMNS
+from .dues_approval import pending_dues, approve_pending
+from .receipts import verify_receipt as check_receipt
+from .ratelimit import rate_limit
+from .querybudget import query_budget
+from .receipt_pdf import receipt_filename, receipt_pdf
+from .cgpa import (student_cgpa, course_contribution, course_added, course_changed,
+                   course_removed, semester_removed, add_courses, sync_courses,
+                   record_calculation)
+
+SEARCH_PAGE_SIZE = 20
+MAX_BATCH_COURSES = 50
 
 # Public Views
+@query_budget(10)
 def index(request):
-    # Get all data for busy homepage
-    testimonials = Testimonial.objects.filter(is_approved=True)[:6]
-    announcements = Announcement.objects.filter(is_active=True)[:5]
-    recent_staff = Staff.objects.all()[:3]
-    current_excos = Exco.objects.all()[:4]
-    recent_resources = LibraryResource.objects.all()[:6]
-    recent_questions = PastQuestion.objects.all()[:5]
-    
-    # Statistics for homepage
-    stats = {
-        'total_staff': Staff.objects.count(),
-        'total_students': 500,  # You can make this dynamic later
-        'total_resources': LibraryResource.objects.count(),
-        'total_questions': PastQuestion.objects.count(),
-    }
-    
-    # Questions by level for chart
-    questions_by_level = PastQuestion.objects.values('level').annotate(count=Count('id'))
-    
-    return render(request, 'core/index.html', {
-        'testimonials': testimonials,
-        'announcements': announcements,
-        'recent_staff': recent_staff,
-        'current_excos': current_excos,
-        'recent_resources': recent_resources,
-        'recent_questions': recent_questions,
-        'stats': stats,
-        'questions_by_level': questions_by_level,
-    })
+    # Busy homepage data is cached until homepage content changes
+    return render(request, 'core/index.html', homepage_context())
 
 def virtual_tour(request):
     """Virtual tour page with video placeholders"""
@@ -93,14 +92,17 @@ def virtual_tour(request):
         'tour_locations': tour_locations
     })
 
+@query_budget(3)
 def staff_list(request):
     staff = Staff.objects.all()
     return render(request, 'core/staff.html', {'staff': staff})
 
+@query_budget(3)
 def exco_list(request):
     excos = Exco.objects.all()
     return render(request, 'core/excos.html', {'excos': excos})
 
+@query_budget(4)
 def past_questions(request):
     level = request.GET.get('level', '')
     semester = request.GET.get('semester', '')
@@ -125,6 +127,7 @@ def past_questions(request):
         'selected_year': year
     })
 
+@query_budget(3)
 def library(request):
     category = request.GET.get('category', '')
     level = request.GET.get('level', '')
@@ -142,6 +145,48 @@ def library(request):
         'selected_level': level
     })
 
+@query_budget(5)
+def search(request):
+    """Search past questions, library resources and the course handbook"""
+    query = request.GET.get('q', '').strip()
+    kind = request.GET.get('type', '')
+    results = site_search(query, [kind] if kind else None)
+
+    paginator = Paginator(results, SEARCH_PAGE_SIZE)
+    page = paginator.get_page(request.GET.get('page'))
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'query': query,
+            'count': paginator.count,
+            'page': page.number,
+            'num_pages': paginator.num_pages,
+            'results': list(page),
+        })
+
+    return render(request, 'core/search.html', {
+        'query': query,
+        'results': page,
+        'total_results': paginator.count,
+        'search_types': [(key, source['label']) for key, source in SEARCH_SOURCES.items()],
+        'selected_type': kind,
+    })
+
+@rate_limit('verify_receipt', 60)
+@query_budget(3)
+def verify_receipt(request):
+    """Public check of a dues receipt by watermark code or receipt number"""
+    code = request.GET.get('code', '')
+    result = check_receipt(code)
+
+    if request.GET.get('format') == 'json':
+        if result is None:
+            return JsonResponse({'error': 'Provide a watermark code or receipt number'}, status=400)
+        return JsonResponse(result)
+
+    return render(request, 'core/verify_receipt.html', {'code': code, 'result': result})
+
+
 def submit_testimonial(request):
     if request.method == 'POST':
         form = TestimonialForm(request.POST)
@@ -192,7 +237,7 @@ def delete_library_resource(request, pk):
 # Testimonials Management
 @login_required
 def manage_testimonials(request):
-    testimonials = Testimonial.objects.all()
+    testimonials = paginate_keyset(request, Testimonial.objects.all())
     return render(request, 'core/admin/manage_testimonials.html', {'testimonials': testimonials})
 
 @login_required
@@ -223,7 +268,7 @@ def delete_testimonial(request, pk):
 # Announcements Management
 @login_required
 def manage_announcements(request):
-    announcements = Announcement.objects.all()
+    announcements = paginate_keyset(request, Announcement.objects.all())
     return render(request, 'core/admin/manage_announcements.html', {'announcements': announcements})
 
 @login_required
@@ -282,21 +327,37 @@ def admin_logout(request):
 
 # Admin Dashboard
 @login_required
+@query_budget(5)
 def admin_dashboard(request):
-    stats = {
-        'staff_count': Staff.objects.count(),
-        'excos_count': Exco.objects.count(),
-        'past_questions_count': PastQuestion.objects.count(),
-        'library_count': LibraryResource.objects.count(),
-        'testimonials_pending': Testimonial.objects.filter(is_approved=False).count(),
-        'announcements_active': Announcement.objects.filter(is_active=True).count(),
-    }
+    stats = get_counters()
     return render(request, 'core/admin/dashboard.html', {'stats': stats})
 
+@login_required
+@query_budget(8)
+def cohort_analytics(request):
+    """Admin views the cached cohort analytics snapshot"""
+    if request.method == 'POST':
+        refresh_snapshot()
+        messages.success(request, 'Analytics refreshed successfully!')
+        return redirect('cohort_analytics')
+
+    snapshot = get_snapshot()
+    level = request.GET.get('level')
+    levels = snapshot['levels']
+    selected = next((row for row in levels if row['level'] == level), levels[0] if levels else None)
+    courses = sorted(snapshot['courses'], key=lambda row: row['mean_grade'])
+
+    return render(request, 'core/admin/analytics.html', {
+        'snapshot': snapshot,
+        'levels': levels,
+        'selected': selected,
+        'courses': courses,
+    })
+
 # Staff Management
 @login_required
 def manage_staff(request):
-    staff = Staff.objects.all()
+    staff = paginate_keyset(request, Staff.objects.all())
     return render(request, 'core/admin/manage_staff.html', {'staff': staff})
 
 @login_required
@@ -336,7 +397,7 @@ def delete_staff(request, pk):
 # Exco Management
 @login_required
 def manage_excos(request):
-    excos = Exco.objects.all()
+    excos = paginate_keyset(request, Exco.objects.all())
     return render(request, 'core/admin/manage_excos.html', {'excos': excos})
 
 @login_required
@@ -376,7 +437,7 @@ def delete_exco(request, pk):
 # Past Questions Management
 @login_required
 def manage_pastquestions(request):
-    questions = PastQuestion.objects.all()
+    questions = paginate_keyset(request, PastQuestion.objects.all())
     return render(request, 'core/admin/manage_pastquestions.html', {'questions': questions})
 
 @login_required
@@ -418,7 +479,7 @@ def delete_pastquestion(request, pk):
 # Library Management
 @login_required
 def manage_library(request):
-    resources = LibraryResource.objects.all()
+    resources = paginate_keyset(request, LibraryResource.objects.all())
     return render(request, 'core/admin/manage_library.html', {'resources': resources})
 
 # STUDENT AUTHENTICATION
@@ -447,13 +508,12 @@ def student_login(request):
         form = StudentLoginForm(request.POST)
         if form.is_valid():
             reg_number = form.cleaned_data['reg_number']
-            try:
-                student = Student.objects.get(reg_number=reg_number)
+            student = load_student(reg_number)
+            if student is not None:
                 request.session['student_reg_number'] = student.reg_number
                 messages.success(request, f'Welcome back, {student.full_name}!')
                 return redirect('student_dashboard')
-            except Student.DoesNotExist:
-                messages.error(request, 'Invalid registration number. Please check and try again.')
+            messages.error(request, 'Invalid registration number. Please check and try again.')
     else:
         form = StudentLoginForm()
     
@@ -469,44 +529,28 @@ def student_logout(request):
 
 # STUDENT DECORATOR
 def student_required(view_func):
+    @wraps(view_func)
     def wrapper(request, *args, **kwargs):
         if not request.session.get('student_reg_number'):
             messages.error(request, 'Please login to access the student portal.')
             return redirect('student_login')
+        if not request.student:
+            # Session points at an account that no longer exists
+            del request.session['student_reg_number']
+            messages.error(request, 'Please login to access the student portal.')
+            return redirect('student_login')
         return view_func(request, *args, **kwargs)
     return wrapper
 
 
 # STUDENT DASHBOARD
 @student_required
+@query_budget(8)
 def student_dashboard(request):
-    reg_number = request.session.get('student_reg_number')
-    student = Student.objects.get(reg_number=reg_number)
+    student = request.student
     
     # Get all semesters and their GPAs
-    semesters = student.semesters.all()
-    semester_data = []
-    total_credits = 0
-    total_points = 0
-    
-    for semester in semesters:
-        gpa = semester.calculate_gpa()
-        courses = semester.courses.all()
-        semester_credits = sum(c.credit_unit for c in courses)
-        semester_points = sum(c.credit_unit * c.grade_point for c in courses)
-        
-        total_credits += semester_credits
-        total_points += semester_points
-        
-        semester_data.append({
-            'semester': semester,
-            'gpa': gpa,
-            'courses_count': courses.count(),
-            'credits': semester_credits
-        })
-    
-    # Calculate CGPA
-    cgpa = round(total_points / total_credits, 2) if total_credits > 0 else 0.0
+    result = student_cgpa(student)
     
     # Get latest CGPA calculation
     latest_cgpa = student.cgpa_calculations.first()
@@ -516,9 +560,9 @@ def student_dashboard(request):
     
     context = {
         'student': student,
-        'semesters': semester_data,
-        'cgpa': cgpa,
-        'total_credits': total_credits,
+        'semesters': result['semesters'],
+        'cgpa': result['cgpa'],
+        'total_credits': result['total_credits'],
         'latest_cgpa': latest_cgpa,
         'announcements': announcements,
     }
@@ -529,8 +573,7 @@ def student_dashboard(request):
 # PROFILE MANAGEMENT
 @student_required
 def student_profile(request):
-    reg_number = request.session.get('student_reg_number')
-    student = Student.objects.get(reg_number=reg_number)
+    student = request.student
     
     if request.method == 'POST':
         form = StudentProfileForm(request.POST, request.FILES, instance=student)
@@ -547,8 +590,7 @@ def student_profile(request):
 @student_required
 def delete_student_account(request):
     if request.method == 'POST':
-        reg_number = request.session.get('student_reg_number')
-        student = Student.objects.get(reg_number=reg_number)
+        student = request.student
         student.delete()
         del request.session['student_reg_number']
         messages.success(request, 'Your account has been deleted successfully.')
@@ -559,9 +601,9 @@ def delete_student_account(request):
 
 # CGPA CALCULATOR
 @student_required
+@query_budget(6)
 def cgpa_calculator(request):
-    reg_number = request.session.get('student_reg_number')
-    student = Student.objects.get(reg_number=reg_number)
+    student = request.student
     semesters = student.semesters.all().prefetch_related('courses')
     
     return render(request, 'core/student/cgpa_calculator.html', {
@@ -573,8 +615,7 @@ def cgpa_calculator(request):
 @student_required
 def add_semester(request):
     if request.method == 'POST':
-        reg_number = request.session.get('student_reg_number')
-        student = Student.objects.get(reg_number=reg_number)
+        student = request.student
         form = SemesterForm(request.POST)
         if form.is_valid():
             semester = form.save(commit=False)
@@ -590,8 +631,7 @@ def add_semester(request):
 
 @student_required
 def edit_semester(request, pk):
-    reg_number = request.session.get('student_reg_number')
-    student = Student.objects.get(reg_number=reg_number)
+    student = request.student
     semester = get_object_or_404(Semester, pk=pk, student=student)
     
     if request.method == 'POST':
@@ -608,13 +648,14 @@ def edit_semester(request, pk):
 
 @student_required
 def delete_semester(request, pk):
-    reg_number = request.session.get('student_reg_number')
-    student = Student.objects.get(reg_number=reg_number)
+    student = request.student
     semester = get_object_or_404(Semester, pk=pk, student=student)
     
     if request.method == 'POST':
         semester_name = semester.name
-        semester.delete()
+        with transaction.atomic():
+            semester.delete()
+            semester_removed(semester)
         messages.success(request, f'Semester "{semester_name}" deleted successfully!')
         return redirect('cgpa_calculator')
     
@@ -627,8 +668,7 @@ def delete_semester(request, pk):
 
 @student_required
 def add_course(request, semester_id):
-    reg_number = request.session.get('student_reg_number')
-    student = Student.objects.get(reg_number=reg_number)
+    student = request.student
     semester = get_object_or_404(Semester, pk=semester_id, student=student)
     
     if request.method == 'POST':
@@ -636,7 +676,9 @@ def add_course(request, semester_id):
         if form.is_valid():
             course = form.save(commit=False)
             course.semester = semester
-            course.save()
+            with transaction.atomic():
+                course.save()
+                course_added(course)
             messages.success(request, f'Course "{course.course_code}" added successfully!')
             return redirect('cgpa_calculator')
     else:
@@ -649,16 +691,155 @@ def add_course(request, semester_id):
     })
 
 
+@student_required
+def fill_semester_from_handbook(request, semester_id):
+    """Add every graded course of a handbook level/semester in one submission"""
+    student = request.student
+    semester = get_object_or_404(Semester, pk=semester_id, student=student)
+    level = request.GET.get('level', student.level)
+    handbook_semester = request.GET.get('semester', 'First')
+
+    existing = set(semester.courses.values_list('course_code', flat=True))
+    handbook_courses = [
+        course for course in CourseHandbook.objects.filter(level=level, semester=handbook_semester)
+        if course.course_code not in existing
+    ]
+
+    if request.method == 'POST':
+        form = HandbookSemesterForm(request.POST, courses=handbook_courses)
+        if form.is_valid():
+            graded = form.graded_courses()
+            if graded:
+                add_courses(semester, [
+                    Course(
+                        course_code=course.course_code,
+                        course_name=course.course_title,
+                        credit_unit=course.credit_unit,
+                        grade_point=grade_point,
+                    )
+                    for course, grade_point in graded
+                ])
+                messages.success(request, f'{len(graded)} courses added to "{semester.name}"!')
+                return redirect('cgpa_calculator')
+            messages.error(request, 'Select a grade for at least one course.')
+    else:
+        form = HandbookSemesterForm(courses=handbook_courses)
+
+    return render(request, 'core/student/handbook_fill.html', {
+        'form': form,
+        'semester': semester,
+        'selected_level': level,
+        'selected_semester': handbook_semester,
+        'level_choices': CourseHandbook.LEVEL_CHOICES,
+        'semester_choices': CourseHandbook.SEMESTER_CHOICES,
+        'skipped_count': len(existing),
+    })
+
+
+def _course_data(row):
+    """
+    CourseForm data from one JSON course. The grade choices compare as
+    text ("5.0"), so numeric grade points such as 5 are made floats first.
+    """
+    if not isinstance(row, dict):
+        return {}
+    data = dict(row)
+    if isinstance(data.get('grade_point'), (int, float)):
+        data['grade_point'] = float(data['grade_point'])
+    return data
+
+
+@student_required
+def course_batch(request, semester_id):
+    """
+    JSON endpoint applying a semester's course creates, updates and deletes
+    in one transaction. Body: {"create": [course], "update": [course with
+    "id"], "delete": [id]}; every course is validated with CourseForm.
+    """
+    student = request.student
+    semester = get_object_or_404(Semester, pk=semester_id, student=student)
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+
+    try:
+        payload = json.loads(request.body)
+        to_create = list(payload.get('create', []))
+        to_update = list(payload.get('update', []))
+        to_delete = [int(pk) for pk in payload.get('delete', [])]
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+    if len(to_create) + len(to_update) + len(to_delete) > MAX_BATCH_COURSES:
+        return JsonResponse({'error': f'At most {MAX_BATCH_COURSES} courses per request'}, status=400)
+
+    try:
+        update_ids = [int(row['id']) for row in to_update]
+    except (KeyError, ValueError, TypeError):
+        return JsonResponse({'error': 'Every update needs an integer "id"'}, status=400)
+    existing = semester.courses.in_bulk(update_ids + to_delete)
+
+    errors = {}
+    created, updated = [], []
+    for index, row in enumerate(to_create):
+        form = CourseForm(_course_data(row))
+        if form.is_valid():
+            created.append(form.save(commit=False))
+        else:
+            errors[f'create.{index}'] = form.errors.get_json_data()
+    seen = set()
+    for index, (pk, row) in enumerate(zip(update_ids, to_update)):
+        course = existing.get(pk)
+        if course is None:
+            errors[f'update.{index}'] = {'id': [{'message': 'Unknown course.', 'code': 'invalid'}]}
+            continue
+        # One instance per id, so a second edit would read the first one's totals
+        if pk in seen or pk in to_delete:
+            errors[f'update.{index}'] = {'id': [{'message': 'Course is changed more than once.',
+                                                 'code': 'duplicate'}]}
+            continue
+        seen.add(pk)
+        previous = course_contribution(course)
+        form = CourseForm(_course_data(row), instance=course)
+        if form.is_valid():
+            updated.append((form.save(commit=False), previous))
+        else:
+            errors[f'update.{index}'] = form.errors.get_json_data()
+    for index, pk in enumerate(to_delete):
+        if pk not in existing:
+            errors[f'delete.{index}'] = {'id': [{'message': 'Unknown course.', 'code': 'invalid'}]}
+    if errors:
+        return JsonResponse({'errors': errors}, status=400)
+
+    semester = sync_courses(semester, created, updated, [existing[pk] for pk in set(to_delete)])
+    summary = student.cgpa_summary
+    return JsonResponse({
+        'semester': {
+            'id': semester.pk,
+            'name': semester.name,
+            'gpa': semester.gpa,
+            'courses_count': semester.courses_count,
+            'total_credits': semester.total_credits,
+        },
+        'cgpa': summary.cgpa,
+        'total_credits': summary.total_credits,
+        'created': [course.pk for course in created],
+        'courses': list(semester.courses.values(
+            'id', 'course_code', 'course_name', 'credit_unit', 'grade_point'
+        )),
+    })
+
+
 @student_required
 def edit_course(request, pk):
-    reg_number = request.session.get('student_reg_number')
-    student = Student.objects.get(reg_number=reg_number)
+    student = request.student
     course = get_object_or_404(Course, pk=pk, semester__student=student)
     
     if request.method == 'POST':
+        previous = course_contribution(course)
         form = CourseForm(request.POST, instance=course)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                form.save()
+                course_changed(course, previous)
             messages.success(request, 'Course updated successfully!')
             return redirect('cgpa_calculator')
     else:
@@ -673,13 +854,14 @@ def edit_course(request, pk):
 
 @student_required
 def delete_course(request, pk):
-    reg_number = request.session.get('student_reg_number')
-    student = Student.objects.get(reg_number=reg_number)
+    student = request.student
     course = get_object_or_404(Course, pk=pk, semester__student=student)
     
     if request.method == 'POST':
         course_name = f"{course.course_code} - {course.course_name}"
-        course.delete()
+        with transaction.atomic():
+            course.delete()
+            course_removed(course)
         messages.success(request, f'Course "{course_name}" deleted successfully!')
         return redirect('cgpa_calculator')
     
@@ -691,46 +873,29 @@ def delete_course(request, pk):
 
 
 @student_required
+@query_budget(10)
 def calculate_cgpa(request):
-    reg_number = request.session.get('student_reg_number')
-    student = Student.objects.get(reg_number=reg_number)
+    student = request.student
     
-    semesters = student.semesters.all()
-    total_credits = 0
-    total_points = 0
-    semester_results = []
+    result = student_cgpa(student, with_courses=True)
+    total_credits = result['total_credits']
+    total_points = result['total_points']
+    cgpa = result['cgpa']
+    semester_results = [{
+        'name': row['semester'].name,
+        'gpa': row['gpa'],
+        'credits': row['credits'],
+        'courses': [{
+            'code': c.course_code,
+            'name': c.course_name,
+            'credits': c.credit_unit,
+            'grade': c.get_grade_letter(),
+            'grade_point': c.grade_point
+        } for c in row['semester'].courses.all()]
+    } for row in result['semesters']]
     
-    for semester in semesters:
-        courses = semester.courses.all()
-        semester_credits = sum(c.credit_unit for c in courses)
-        semester_points = sum(c.credit_unit * c.grade_point for c in courses)
-        gpa = round(semester_points / semester_credits, 2) if semester_credits > 0 else 0.0
-        
-        total_credits += semester_credits
-        total_points += semester_points
-        
-        semester_results.append({
-            'name': semester.name,
-            'gpa': gpa,
-            'credits': semester_credits,
-            'courses': [{
-                'code': c.course_code,
-                'name': c.course_name,
-                'credits': c.credit_unit,
-                'grade': c.get_grade_letter(),
-                'grade_point': c.grade_point
-            } for c in courses]
-        })
-    
-    cgpa = round(total_points / total_credits, 2) if total_credits > 0 else 0.0
-    
-    # Save CGPA calculation
-    CGPACalculation.objects.create(
-        student=student,
-        cgpa=cgpa,
-        total_credit_units=total_credits,
-        total_grade_points=total_points
-    )
+    # Save CGPA calculation, unless nothing changed since the last one
+    record_calculation(student, cgpa, total_credits, total_points)
     
     context = {
         'student': student,
@@ -744,9 +909,9 @@ def calculate_cgpa(request):
 
 
 @student_required
+@query_budget(5)
 def cgpa_history(request):
-    reg_number = request.session.get('student_reg_number')
-    student = Student.objects.get(reg_number=reg_number)
+    student = request.student
     calculations = student.cgpa_calculations.all()[:10]  # Last 10 calculations
     
     return render(request, 'core/student/cgpa_history.html', {
@@ -755,23 +920,39 @@ def cgpa_history(request):
     })
 
 
+@student_required
+@query_budget(6)
+def cgpa_planner(request):
+    """What-if planner: grades needed for a target CGPA and the odds of reaching it"""
+    student = request.student
+    form = CGPAPlannerForm(request.GET or None)
+    plan = None
+    if form.is_valid():
+        plan = plan_cgpa(student, form.cleaned_data['target_cgpa'])
+
+    return render(request, 'core/student/cgpa_planner.html', {
+        'student': student,
+        'form': form,
+        'plan': plan,
+    })
+
+
 # ==================== DEPARTMENTAL DUES VIEWS ====================
 
 @login_required
+@query_budget(6)
 def manage_departmental_dues(request):
     """Admin view to manage all departmental dues"""
-    dues = DepartmentalDues.objects.all().select_related('student', 'approved_by')
+    dues = paginate_keyset(request, DepartmentalDues.objects.select_related('student', 'approved_by'))
 
-    # Compute summary statistics
-    total_count = dues.count()
-    approved_count = dues.filter(is_approved=True).count()
-    pending_count = dues.filter(is_approved=False).count()
+    # Summary statistics are maintained in SiteCounters
+    counters = get_counters()
 
     context = {
         'dues': dues,
-        'total_count': total_count,
-        'approved_count': approved_count,
-        'pending_count': pending_count,
+        'total_count': counters.dues_total,
+        'approved_count': counters.dues_approved,
+        'pending_count': counters.dues_pending,
     }
     return render(request, 'core/admin/manage_dues.html', context)
 
@@ -794,6 +975,92 @@ def add_departmental_dues(request):
     return render(request, 'core/admin/dues_form.html', {'form': form, 'action': 'Add'})
 
 
+@login_required
+def bulk_approve_dues(request):
+    """Admin approves every pending dues record for a session and level at once"""
+    academic_session = request.POST.get('academic_session', request.GET.get('academic_session', ''))
+    level = request.POST.get('level', request.GET.get('level', ''))
+    pending = pending_dues(academic_session, level)
+
+    if request.method == 'POST':
+        progress = approve_pending(pending, request.user)
+        if 'application/x-ndjson' in request.headers.get('Accept', ''):
+            # Stream one line per batch for the progress bar
+            lines = (json.dumps({'approved': approved, 'total': total}) + '\n' for approved, total in progress)
+            return StreamingHttpResponse(lines, content_type='application/x-ndjson')
+        approved = 0
+        for approved, _ in progress:
+            pass
+        messages.success(request, f'{approved} dues approved successfully!')
+        return redirect('manage_departmental_dues')
+
+    sessions = (DepartmentalDues.objects.filter(is_approved=False)
+                .order_by('-academic_session').values_list('academic_session', flat=True).distinct())
+    return render(request, 'core/admin/bulk_approve_dues.html', {
+        'pending_count': pending.count(),
+        'sessions': sessions,
+        'levels': Student.LEVEL_CHOICES,
+        'selected_session': academic_session,
+        'selected_level': level,
+    })
+
+
+@login_required
+@query_budget(4)
+def student_lookup(request):
+    """JSON student search for the dues form's student picker"""
+    try:
+        limit = int(request.GET.get('limit', MAX_STUDENT_RESULTS))
+    except ValueError:
+        limit = MAX_STUDENT_RESULTS
+    return JsonResponse({'results': suggest_students(request.GET.get('q', ''), limit)})
+
+
+@login_required
+def import_departmental_dues(request):
+    """Admin imports dues for many students from a CSV/XLSX payment list"""
+    report = None
+    if request.method == 'POST':
+        form = DuesImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                report = import_dues(
+                    read_rows(form.cleaned_data['file']),
+                    form.cleaned_data['academic_session'],
+                    form.cleaned_data['amount_paid'],
+                    approve=form.cleaned_data['approve'],
+                    approved_by=request.user,
+                )
+            except ImportFileError as error:
+                form.add_error('file', str(error))
+            else:
+                messages.success(request, f"{len(report['created'])} dues records imported.")
+    else:
+        form = DuesImportForm()
+    return render(request, 'core/admin/dues_import.html', {'form': form, 'report': report})
+
+
+@login_required
+def import_student_roster(request):
+    """Admin registers a department's students from a CSV/XLSX roster"""
+    report = None
+    if request.method == 'POST':
+        form = RosterImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                report = import_roster(
+                    read_rows(form.cleaned_data['file'], required=ROSTER_COLUMNS),
+                    level=form.cleaned_data['level'],
+                )
+            except ImportFileError as error:
+                form.add_error('file', str(error))
+            else:
+                messages.success(request, f"{report['created']} students registered.")
+    else:
+        form = RosterImportForm()
+    return render(request, 'core/admin/roster_import.html', {'form': form, 'report': report})
+
+
 @login_required
 def edit_departmental_dues(request, pk):
     """Admin edits departmental dues"""
@@ -816,7 +1083,7 @@ def edit_departmental_dues(request, pk):
 @login_required
 def approve_dues(request, pk):
     """Admin approves departmental dues"""
-    dues = get_object_or_404(DepartmentalDues, pk=pk)
+    dues = get_object_or_404(DepartmentalDues.objects.select_related('student'), pk=pk)
     dues.is_approved = True
     dues.approved_by = request.user
     dues.approved_at = timezone.now()
@@ -837,10 +1104,10 @@ def delete_departmental_dues(request, pk):
 
 
 @student_required
+@query_budget(6)
 def my_receipt(request):
     """Student views their departmental receipt"""
-    reg_number = request.session.get('student_reg_number')
-    student = Student.objects.get(reg_number=reg_number)
+    student = request.student
     
     try:
         dues = DepartmentalDues.objects.get(student=student)
@@ -854,10 +1121,10 @@ def my_receipt(request):
 
 
 @student_required
+@query_budget(6)
 def print_receipt(request):
     """Student prints their receipt"""
-    reg_number = request.session.get('student_reg_number')
-    student = Student.objects.get(reg_number=reg_number)
+    student = request.student
     
     try:
         dues = DepartmentalDues.objects.get(student=student, is_approved=True)
@@ -871,6 +1138,23 @@ def print_receipt(request):
     })
 
 
+@student_required
+@query_budget(5)
+def download_receipt(request):
+    """Student downloads their approved receipt as a PDF"""
+    student = request.student
+    dues = (DepartmentalDues.objects.select_related('student', 'approved_by')
+            .filter(student=student, is_approved=True).first())
+    if dues is None:
+        messages.error(request, 'Your departmental dues have not been approved yet.')
+        return redirect('my_receipt')
+
+    response = HttpResponse(receipt_pdf(dues, request.build_absolute_uri('/')[:-1]),
+                            content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="{receipt_filename(dues)}"'
+    return response
+
+
 # ==================== COURSE HANDBOOK VIEWS ====================
 
 @login_required
@@ -933,6 +1217,7 @@ def delete_course_handbook(request, pk):
     return render(request, 'core/admin/confirm_delete.html', {'object': course, 'type': 'Course'})
 
 
+@query_budget(3)
 def view_course_handbook(request):
     """Public/Student view of course handbook"""
     level = request.GET.get('level', '100')
@@ -951,13 +1236,28 @@ def view_course_handbook(request):
     })
 
 
+@query_budget(3)
+def course_autocomplete(request):
+    """JSON course suggestions from the handbook, served from memory"""
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_SUGGESTIONS))
+    except ValueError:
+        limit = DEFAULT_SUGGESTIONS
+    return JsonResponse({'results': suggest_courses(request.GET.get('q', ''), limit)})
+
+
 # ==================== TIMETABLE VIEWS ====================
 
 @login_required
 def manage_timetables(request):
     """Admin manages timetables"""
-    timetables = Timetable.objects.all()
-    return render(request, 'core/admin/manage_timetables.html', {'timetables': timetables})
+    timetables = paginate_keyset(request, Timetable.objects.select_related('uploaded_by'))
+    stats = Timetable.objects.aggregate(
+        total_count=Count('id'),
+        exam_count=Count('id', filter=Q(timetable_type='Exam')),
+        class_count=Count('id', filter=Q(timetable_type='Class')),
+    )
+    return render(request, 'core/admin/manage_timetables.html', {'timetables': timetables, 'stats': stats})
 
 
 @login_required
@@ -1023,8 +1323,12 @@ def view_timetables(request):
 @login_required
 def manage_calendars(request):
     """Admin manages academic calendars"""
-    calendars = AcademicCalendar.objects.all()
-    return render(request, 'core/admin/manage_calendars.html', {'calendars': calendars})
+    calendars = paginate_keyset(request, AcademicCalendar.objects.select_related('uploaded_by'))
+    stats = AcademicCalendar.objects.aggregate(
+        total_count=Count('id'),
+        active_count=Count('id', filter=Q(is_active=True)),
+    )
+    return render(request, 'core/admin/manage_calendars.html', {'calendars': calendars, 'stats': stats})
 
 
 @login_required
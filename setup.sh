@@ -7,4 +7,5 @@ pip install -r requirements.txt
 # Run django commands
 python manage.py makemigrations
 python manage.py migrate
+python manage.py createcachetable
 python manage.py collectstatic
\ No newline at end of file